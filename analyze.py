@@ -0,0 +1,162 @@
+# batch analysis of the game log (see gameRecord.py): replays every game, searches every position again
+# with the engine of makeMove at a fixed depth or number of nodes, and writes the score of the move played,
+# the score of the best move and a blunder flag for every move into one columnar file:
+#   python analyze.py games.bin --depth 6 --workers 8
+#   python analyze.py games.bin old.bin --nodes 20000 --output analysis.bin
+# the games are searched in parallel on a pool of processes. every game starts with an empty
+# transposition table and no time limit, so the result of a game does not depend on which process
+# searched it or on how busy the machine was.
+# the output has a header (magic, version, number of rows and of columns), then every column as its name,
+# the typecode of its array (see the array module) and its values. readAnalysis reads it back.
+# scores are for the player who moved, from WIN_SCORE (won) to -WIN_SCORE (lost).
+import argparse
+import struct
+import sys
+import time
+from array import array
+from multiprocessing import Pool
+
+import wolflieu
+from bitboard import Board, Position
+from gameRecord import readGames
+
+MAGIC = b"LMAN"
+VERSION = 1
+HEADER = struct.Struct("<4sIQI")
+COLUMN = struct.Struct("<16sc")
+
+# the columns of the output and the typecodes of their arrays:
+#   game       number of the game in the logs, counting from 0
+#   ply        number of the move in the game, counting from 1 (the turn)
+#   colour     the player who moved, 0 blue and 1 orange
+#   bot        1 when the bot that logged the game made the move
+#   move       the move played (packed like bitboard.encodeMove)
+#   bestMove   the best move the search found
+#   score      score of the move played
+#   bestScore  score of the best move
+#   depth      depth of the search
+#   nodes      nodes the search visited
+#   blunder    1 when the move played scores at least --blunder below the best move
+COLUMNS = [("game", "i"), ("ply", "H"), ("colour", "B"), ("bot", "B"), ("move", "H"), ("bestMove", "H"),
+           ("score", "i"), ("bestScore", "i"), ("depth", "B"), ("nodes", "q"), ("blunder", "B")]
+
+# a move scoring this much below the best move is a blunder (half a man in the movement phase)
+BLUNDER = 25
+# depth of the search when no --nodes are given
+DEPTH = 4
+
+
+# settings of each worker process: searches go to depth plies, or stop after nodeLimit nodes
+def setup(depth, nodeLimit, blunder):
+    global threshold
+    wolflieu.MAX_DEPTH = depth
+    wolflieu.nodeLimit = nodeLimit
+    threshold = blunder
+
+# the score of move, the best move, the score of the best move, the depth and the nodes of the search of
+# board (a Board with type 1 to move) at turn
+def analyzePosition(board, turn, lastChanged, move):
+    wolflieu.table.newSearch()
+    limit = wolflieu.nodeLimit
+    bestMove, bestScore, depth = wolflieu.iterativeDeepening(board, turn, lastChanged, time.time(), float("inf"), float("inf"))
+    nodes = wolflieu.nodes
+    if move == bestMove:
+        return bestScore, bestMove, bestScore, depth, nodes
+    # the move played gets a search as deep as the one of the best move, whatever the nodes it takes
+    position = Position(board.pieces[0], board.pieces[1], 0, turn, lastChanged)
+    position.make(move)
+    wolflieu.nodeLimit = float("inf")
+    try:
+        score = -wolflieu.search(position, max(depth - 1, 0), -wolflieu.INFINITY, wolflieu.INFINITY)
+    finally:
+        wolflieu.nodeLimit = limit
+    # a deeper look at the move played can find it better than the move the search stopped with
+    return score, bestMove, max(score, bestScore), depth, nodes + wolflieu.nodes
+
+# the rows of game number index, one tuple of the columns per move, with the rules of the referee.
+# a move that is not legal ends the analysis of the game
+def analyzeGame(task):
+    index, botBlue, moves = task
+    wolflieu.table.clear()
+    board = Board()
+    lastChanged = 21
+    rows = []
+    for turn, move in enumerate(moves, 1):
+        side = (turn - 1) % 2
+        if (turn > 20 and board.men[side] < 3) or turn - lastChanged == 20 or not board.isLegal(side, turn, move):
+            print("game", index, "has an illegal move at turn", turn, file = sys.stderr, flush = True)
+            break
+        # the engine searches with its own men as type 1
+        view = Board(board.pieces[side], board.pieces[1 - side])
+        score, bestMove, bestScore, depth, nodes = analyzePosition(view, turn, lastChanged, move)
+        rows.append((index, turn, side, int(botBlue == (side == 0)), move, bestMove, score, bestScore, depth, nodes, int(bestScore - score >= threshold)))
+        board.makeMove(side, move)
+        if turn > 20 and move >> 10:
+            lastChanged = turn
+    return rows
+
+# the games of all the logs at paths as tasks of analyzeGame, numbered in order
+def readTasks(paths):
+    index = 0
+    for path in paths:
+        for botBlue, moves in readGames(path):
+            yield index, botBlue, moves
+            index += 1
+
+# write the columns (arrays in the order of COLUMNS) to path
+def writeAnalysis(path, columns):
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(columns[0]), len(columns)))
+        for (name, typecode), values in zip(COLUMNS, columns):
+            file.write(COLUMN.pack(name.encode(), typecode.encode()))
+            values.tofile(file)
+
+# the columns of the analysis file at path, as a dict of name to array
+def readAnalysis(path):
+    with open(path, "rb") as file:
+        magic, version, rows, count = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(path + " is not an analysis file")
+        columns = {}
+        for column in range(count):
+            name, typecode = COLUMN.unpack(file.read(COLUMN.size))
+            values = array(typecode.decode())
+            values.fromfile(file, rows)
+            columns[name.rstrip(b"\0").decode()] = values
+    return columns
+
+def main():
+    parser = argparse.ArgumentParser(description = "search every move of logged games again and flag the blunders")
+    parser.add_argument("logs", nargs = "+", help = "game logs written by the bots")
+    parser.add_argument("--depth", type = int, default = None, help = "depth of every search (default " + str(DEPTH) + " without --nodes)")
+    parser.add_argument("--nodes", type = int, default = None, help = "nodes of every search")
+    parser.add_argument("--workers", type = int, default = 1, help = "number of processes searching")
+    parser.add_argument("--blunder", type = int, default = BLUNDER, help = "score lost by a move that is a blunder")
+    parser.add_argument("--output", default = "analysis.bin")
+    args = parser.parse_args()
+
+    depth = args.depth
+    if depth is None:
+        depth = wolflieu.MAX_DEPTH if args.nodes is not None else DEPTH
+    nodeLimit = float("inf") if args.nodes is None else args.nodes
+
+    start = time.time()
+    columns = [array(typecode) for name, typecode in COLUMNS]
+    games = blunders = 0
+    with Pool(args.workers, initializer = setup, initargs = (depth, nodeLimit, args.blunder)) as pool:
+        for rows in pool.imap(analyzeGame, readTasks(args.logs), chunksize = 4):
+            for row in rows:
+                for values, value in zip(columns, row):
+                    values.append(value)
+                blunders += row[-1]
+            games += 1
+            if games % 100 == 0:
+                print(games, "games,", len(columns[0]), "moves,", blunders, "blunders", file = sys.stderr, flush = True)
+    writeAnalysis(args.output, columns)
+    seconds = time.time() - start
+    moves = len(columns[0])
+    print(games, "games,", moves, "moves in", round(seconds, 1), "s:", round(moves / max(seconds, 1e-6), 1), "moves/s")
+    print(blunders, "blunders, written to", args.output)
+
+if __name__ == "__main__":
+    main()
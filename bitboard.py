@@ -0,0 +1,332 @@
+# bitboard version of the board used by the search.
+# each colour is a 24 bit integer, bit i is set when the colour has a man on position i.
+# the positions are numbered row by row in the same order as the list board:
+#   a7 d7 g7 / b6 d6 f6 / c5 d5 e5 / a4 b4 c4 e4 f4 g4 / c3 d3 e3 / b2 d2 f2 / a1 d1 g1
+# so board[row][col] of the list board is bit ROW_START[row] + col (see geometry.py)
+
+import struct
+
+from geometry import ROW_START, NAMES, POINT_OF_NAME, POINTS, MILLS, NEIGHBOURS, CENTER_POINTS
+from zobrist import SYMMETRIC_KEYS, piecesKeys
+from symmetry import FIELD_TABLES, transformBits
+
+FULL = (1 << 24) - 1
+
+# masks built from the geometry tables:
+# POINT_MILLS[p] holds the masks of the two mills going through p, MILL_MASKS all 16 mills,
+# ADJACENT[p] the positions next to p
+POINT_MILLS = [[(1 << p) | (1 << mill[0]) | (1 << mill[1]) for mill in MILLS[p]] for p in range(24)]
+MILL_MASKS = sorted(set(mask for masks in POINT_MILLS for mask in masks))
+ADJACENT = [sum(1 << other for other in NEIGHBOURS[p]) for p in range(24)]
+CENTER = sum(1 << p for p in CENTER_POINTS)
+
+# the 16 keys packed in Board.hashes
+SYMMETRIC_HASHES = struct.Struct("<16Q")
+
+# convert [row, col] of the list board into a bit index
+def indexToBit(row, col):
+    return ROW_START[row] + col
+
+# convert a bit index back into [row, col] of the list board
+def bitToIndex(bit):
+    return POINTS[bit]
+
+# convert the text of a position into a bit index, -1 for h1, h2 and r0
+def moveToBit(str):
+    return POINT_OF_NAME.get(str, -1)
+
+# convert a bit index into the text of the position
+def bitToMove(bit):
+    return NAMES[bit]
+
+# check if men (a bitboard of one colour) has a mill going through bit
+def formsMill(men, bit):
+    for mask in POINT_MILLS[bit]:
+        if men & mask == mask:
+            return True
+    return False
+
+# a move is packed into one int: from + 1 in bits 0-4, to + 1 in bits 5-9 and remove + 1 in bits 10-14,
+# where a from of 0 is a man placed from the hand and a remove of 0 is no removal.
+# 0 itself is no move. the transposition table and the opening book store moves the same way
+NO_MOVE = 0
+# set in a move that removes a man
+REMOVE_BITS = 31 << 10
+
+def encodeMove(source, target, remove):
+    return (source + 1) | ((target + 1) << 5) | ((remove + 1) << 10)
+
+# split a move into (from, to, remove), with -1 for no from or no remove
+def decodeMove(move):
+    return (move & 31) - 1, ((move >> 5) & 31) - 1, (move >> 10) - 1
+
+def moveFrom(move):
+    return (move & 31) - 1
+
+def moveTo(move):
+    return ((move >> 5) & 31) - 1
+
+def moveRemove(move):
+    return (move >> 10) - 1
+
+# list every bit index set in mask, from the lowest to the highest
+def bitsOf(mask):
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+
+# the board itself: pieces[0] holds the men of type 1 (the engine), pieces[1] the men of type -1 (the opponent).
+# everything else is kept up to date on every place and clear, so the evaluation only reads integers:
+#   hashes      Zobrist keys of the men on the board under each of the 16 symmetries (see symmetry.py),
+#               packed into one int (see zobrist.SYMMETRIC_KEYS). the smallest one is the key of the
+#               canonical version of the position
+#   men         number of men of each side
+#   centre      number of men of each side on a middle position
+#   mobility    number of moves to an adjacent empty position for the men of each side
+#   mills       mask of the men of each side that are part of a mill. it only changes when a mill
+#               forms (a man is placed) or breaks (a man in a mill is cleared)
+class Board:
+    __slots__ = ("pieces", "hashes", "men", "centre", "mobility", "mills")
+
+    def __init__(self, mine = 0, theirs = 0):
+        self.pieces = [mine, theirs]
+        self.refresh()
+
+    # compute the incremental terms from scratch
+    def refresh(self):
+        empty = self.empty()
+        self.hashes = piecesKeys(self.pieces[0], self.pieces[1])
+        self.men = [self.pieces[0].bit_count(), self.pieces[1].bit_count()]
+        self.centre = [(self.pieces[0] & CENTER).bit_count(), (self.pieces[1] & CENTER).bit_count()]
+        self.mobility = [0, 0]
+        for side in range(2):
+            for bit in bitsOf(self.pieces[side]):
+                self.mobility[side] += (ADJACENT[bit] & empty).bit_count()
+        self.mills = [self.findMills(0), self.findMills(1)]
+
+    # build the bitboards from the list board used by main()
+    @classmethod
+    def fromList(cls, board):
+        mine = 0
+        theirs = 0
+        for row in range(7):
+            for col in range(len(board[row])):
+                if board[row][col] == 1:
+                    mine |= 1 << indexToBit(row, col)
+                elif board[row][col] == -1:
+                    theirs |= 1 << indexToBit(row, col)
+        return cls(mine, theirs)
+
+    # convert back into the list board, mostly for printBoard
+    def toList(self):
+        board = [[0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0, 0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0]]
+        for side in range(2):
+            for bit in bitsOf(self.pieces[side]):
+                row, col = bitToIndex(bit)
+                board[row][col] = 1 if side == 0 else -1
+        return board
+
+    # put a man of side on the empty position bit
+    def place(self, side, bit):
+        pieces = self.pieces
+        adjacent = ADJACENT[bit]
+        # the new man can move to its free neighbours, and its neighbours cannot move to bit anymore
+        self.mobility[side] += (adjacent & FULL & ~(pieces[0] | pieces[1])).bit_count()
+        self.mobility[0] -= (adjacent & pieces[0]).bit_count()
+        self.mobility[1] -= (adjacent & pieces[1]).bit_count()
+        pieces[side] |= 1 << bit
+        self.hashes ^= SYMMETRIC_KEYS[side][bit]
+        self.men[side] += 1
+        self.centre[side] += (CENTER >> bit) & 1
+        # only a mill through the new man can form
+        men = pieces[side]
+        for mask in POINT_MILLS[bit]:
+            if men & mask == mask:
+                self.mills[side] |= mask
+
+    # take the man of side away from bit
+    def clear(self, side, bit):
+        pieces = self.pieces
+        pieces[side] &= ~(1 << bit)
+        adjacent = ADJACENT[bit]
+        self.mobility[side] -= (adjacent & FULL & ~(pieces[0] | pieces[1])).bit_count()
+        self.mobility[0] += (adjacent & pieces[0]).bit_count()
+        self.mobility[1] += (adjacent & pieces[1]).bit_count()
+        self.hashes ^= SYMMETRIC_KEYS[side][bit]
+        self.men[side] -= 1
+        self.centre[side] -= (CENTER >> bit) & 1
+        # the mills through bit break, the other men of those mills may still be in another one
+        if (self.mills[side] >> bit) & 1:
+            self.mills[side] = self.findMills(side)
+
+    # the key of the canonical version of the position, and the symmetry that turns the position into it
+    def canonicalHash(self):
+        keys = SYMMETRIC_HASHES.unpack(self.hashes.to_bytes(128, "little"))
+        key = min(keys)
+        return key, keys.index(key)
+
+    def empty(self):
+        return FULL & ~(self.pieces[0] | self.pieces[1])
+
+    def count(self, side):
+        return self.men[side]
+
+    # check if the man of side on bit is part of a mill
+    def inMill(self, side, bit):
+        return (self.mills[side] >> bit) & 1 == 1
+
+    # mask of all the men of side that are part of a mill
+    def millMen(self, side):
+        return self.mills[side]
+
+    # mask of the men of side in a mill, from scratch (see mills)
+    def findMills(self, side):
+        men = self.pieces[side]
+        inMill = 0
+        for mask in MILL_MASKS:
+            if men & mask == mask:
+                inMill |= mask
+        return inMill
+
+    # men of side that can be removed: the ones that are not in a mill, or all of them if every man is in a mill
+    def removable(self, side):
+        men = self.pieces[side]
+        free = men & ~self.mills[side]
+        if free:
+            return free
+        return men
+
+    # list all the legal moves of side (see encodeMove). with distinct, of the removals that lead to the same
+    # or to symmetric positions only one is listed (see distinctRemovals), which is all the search needs
+    def generateMoves(self, side, turn, distinct = False):
+        mills, quiet = self.splitMoves(side, turn, distinct)
+        return mills + quiet
+
+    # the legal moves of side in two lists: the ones that close a mill and the others
+    def splitMoves(self, side, turn, distinct = False):
+        mills = []
+        quiet = []
+        empty = self.empty()
+        men = self.pieces[side]
+        if turn <= 20:
+            sources = [-1]
+        else:
+            sources = bitsOf(men)
+        flying = turn > 20 and len(sources) == 3
+        removes = None
+        for source in sources:
+            if source == -1 or flying:
+                targets = empty
+            else:
+                targets = ADJACENT[source] & empty
+            if not targets:
+                continue
+            moved = men
+            if source != -1:
+                moved &= ~(1 << source)
+            for target in bitsOf(targets):
+                move = (source + 1) | ((target + 1) << 5)
+                if formsMill(moved | (1 << target), target):
+                    # the men of the opponent do not change with our move, so the removable ones are found once
+                    if removes is None:
+                        removes = [(remove + 1) << 10 for remove in bitsOf(self.removable(1 - side))]
+                        # after the placement phase every removal from 3 men wins the game the same way
+                        if distinct and turn >= 20 and self.men[1 - side] == 3:
+                            removes = removes[:1]
+                    if distinct and len(removes) > 1:
+                        for remove in self.distinctRemovals(side, source, target, removes):
+                            mills.append(move | remove)
+                    else:
+                        for remove in removes:
+                            mills.append(move | remove)
+                else:
+                    quiet.append(move)
+        return mills, quiet
+
+    # the removals (packed into bits 10-14) of the move of side from source to target that do not lead to the
+    # same position as an earlier one by a symmetry of the position after the man moved. a symmetry that
+    # keeps that position as it is sends every removal to an equivalent one, and of the removals it sends
+    # into each other only the one of the lowest point is kept
+    def distinctRemovals(self, side, source, target, removes):
+        hashes = self.hashes ^ SYMMETRIC_KEYS[side][target]
+        men = self.pieces[side] | (1 << target)
+        if source != -1:
+            hashes ^= SYMMETRIC_KEYS[side][source]
+            men &= ~(1 << source)
+        keys = SYMMETRIC_HASHES.unpack(hashes.to_bytes(128, "little"))
+        # the position is its own symmetric version when its key under the symmetry is its key
+        if keys.count(keys[0]) == 1:
+            return removes
+        theirs = self.pieces[1 - side]
+        symmetries = [FIELD_TABLES[s] for s in range(1, 16) if keys[s] == keys[0]
+                      and transformBits(men, s) == men and transformBits(theirs, s) == theirs]
+        return [remove for remove in removes if all(table[remove >> 10] >= remove >> 10 for table in symmetries)]
+
+    # check if move (from another position, like a killer or the move of the transposition table) is legal for side
+    def isLegal(self, side, turn, move):
+        source, target, remove = decodeMove(move)
+        if target < 0 or not (self.empty() >> target) & 1:
+            return False
+        men = self.pieces[side]
+        if turn <= 20:
+            if source != -1:
+                return False
+            moved = men
+        else:
+            if source == -1 or not (men >> source) & 1:
+                return False
+            if self.men[side] != 3 and not (ADJACENT[source] >> target) & 1:
+                return False
+            moved = men & ~(1 << source)
+        if not formsMill(moved | (1 << target), target):
+            return remove == -1
+        return remove != -1 and (self.removable(1 - side) >> remove) & 1 == 1
+
+    # apply a move given by generateMoves
+    def makeMove(self, side, move):
+        if move & 31:
+            self.clear(side, (move & 31) - 1)
+        self.place(side, ((move >> 5) & 31) - 1)
+        if move >> 10:
+            self.clear(1 - side, (move >> 10) - 1)
+
+    # take back a move given by generateMoves
+    def undoMove(self, side, move):
+        if move >> 10:
+            self.place(1 - side, (move >> 10) - 1)
+        self.clear(side, ((move >> 5) & 31) - 1)
+        if move & 31:
+            self.place(side, (move & 31) - 1)
+
+
+# a board with the rest of the state of the game: the side to move (0 for type 1, 1 for type -1), the turn and
+# the turn the stalemate counter runs from (see nextLastChanged in wolflieu.py). make() plays a move of the
+# side to move and keeps what unmake() needs to take it back on the undo stack
+class Position(Board):
+    __slots__ = ("side", "turn", "lastChanged", "undo")
+
+    def __init__(self, mine = 0, theirs = 0, side = 0, turn = 1, lastChanged = 21):
+        Board.__init__(self, mine, theirs)
+        self.side = side
+        self.turn = turn
+        self.lastChanged = lastChanged
+        self.undo = []
+
+    def make(self, move):
+        self.undo.append((move, self.lastChanged))
+        self.makeMove(self.side, move)
+        # in the placement phase and after a removal the counter starts again from the next turn
+        if self.turn <= 20 or move >> 10:
+            self.lastChanged = self.turn + 1
+        self.turn += 1
+        self.side ^= 1
+
+    def unmake(self):
+        move, self.lastChanged = self.undo.pop()
+        self.turn -= 1
+        self.side ^= 1
+        self.undoMove(self.side, move)
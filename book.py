@@ -0,0 +1,76 @@
+# opening book for the placement phase, written by buildBook.py and read with mmap.
+# file layout:
+#   header   b"LMBK", version (uint32), number of records (uint64)
+#   records  sorted by key, each one key (uint64) and move (uint16, packed like bitboard.encodeMove)
+# the key of a position is positionKey() of its canonical version (see symmetry.py) and the move is
+# stored for the canonical version too, so one record covers all 16 symmetric positions
+import mmap
+import os
+import struct
+
+from symmetry import canonical, transformMove, INVERSE
+
+# where the engine looks for the book
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+MAGIC = b"LMBK"
+VERSION = 1
+HEADER = struct.Struct("<4sIQ")
+RECORD = struct.Struct("<QH")
+KEY = struct.Struct("<Q")
+
+# key of a placement phase position: the men of the player to move, the men of the other player, and the turn
+def positionKey(mine, theirs, turn):
+    return (((mine << 24) | theirs) << 5) | turn
+
+# write records [(key, move), ...] into a book file
+def writeBook(path, records):
+    records = sorted(records)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for key, move in records:
+            file.write(RECORD.pack(key, move))
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(path + " is not an opening book")
+
+    # open the book at path, or return None when there is no book
+    @classmethod
+    def open(cls, path):
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    # binary search for key, return the move or None
+    def find(self, key):
+        low = 0
+        high = self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD.size
+            found = KEY.unpack_from(self.data, offset)[0]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle - 1
+            else:
+                return RECORD.unpack_from(self.data, offset)[1]
+        return None
+
+    # the book move for the player to move with men mine against theirs, or None
+    def lookup(self, mine, theirs, turn):
+        canonMine, canonTheirs, s = canonical(mine, theirs)
+        move = self.find(positionKey(canonMine, canonTheirs, turn))
+        if move is None:
+            return None
+        return transformMove(move, INVERSE[s])
@@ -0,0 +1,66 @@
+# offline builder of the opening book (see book.py).
+# every placement phase position reachable in the first --plies turns is searched (one position
+# for each group of symmetric positions) and its best move is written to the book:
+#   python buildBook.py --plies 4 --depth 7 --workers 8
+import argparse
+import time
+from multiprocessing import Pool
+
+import wolflieu
+from bitboard import Board
+from symmetry import canonical
+from book import BOOK_FILE, positionKey, writeBook
+
+# all the canonical placement positions (mine, theirs, turn) with mine to move, from turn 1 to turn plies + 1
+def placementPositions(plies):
+    positions = []
+    level = {(0, 0)}
+    for turn in range(1, min(plies, 19) + 2):
+        positions += [(mine, theirs, turn) for mine, theirs in sorted(level)]
+        nextLevel = set()
+        for mine, theirs in level:
+            board = Board(mine, theirs)
+            for move in board.generateMoves(0, turn):
+                board.makeMove(0, move)
+                # after the move the other player is the one to move
+                nextLevel.add(canonical(board.pieces[1], board.pieces[0])[:2])
+                board.undoMove(0, move)
+        level = nextLevel
+    return positions
+
+# settings of the search in each worker process
+def setup(depth, seconds):
+    global searchTime
+    wolflieu.MAX_DEPTH = depth
+    searchTime = seconds
+
+# search one position and return its book record
+def searchPosition(position):
+    mine, theirs, turn = position
+    wolflieu.table.newSearch()
+    move, score, depth = wolflieu.iterativeDeepening(Board(mine, theirs), turn, 21, time.time(), searchTime / 2, searchTime)
+    return positionKey(mine, theirs, turn), move
+
+def main():
+    parser = argparse.ArgumentParser(description = "build the opening book of the placement phase")
+    parser.add_argument("--plies", type = int, default = 4, help = "book positions up to this many turns into the game")
+    parser.add_argument("--depth", type = int, default = 7, help = "search depth for every position")
+    parser.add_argument("--seconds", type = float, default = float("inf"), help = "time limit for every position")
+    parser.add_argument("--workers", type = int, default = 1, help = "number of processes searching")
+    parser.add_argument("--output", default = BOOK_FILE)
+    args = parser.parse_args()
+
+    positions = placementPositions(args.plies)
+    print(len(positions), "positions", flush = True)
+    start = time.time()
+    records = []
+    with Pool(args.workers, initializer = setup, initargs = (args.depth, args.seconds)) as pool:
+        for record in pool.imap_unordered(searchPosition, positions, chunksize = 4):
+            records.append(record)
+            if len(records) % 100 == 0:
+                print(len(records), "searched in", round(time.time() - start, 1), "s", flush = True)
+    writeBook(args.output, records)
+    print("wrote", len(records), "moves to", args.output, "in", round(time.time() - start, 1), "s")
+
+if __name__ == "__main__":
+    main()
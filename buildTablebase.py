@@ -0,0 +1,177 @@
+# builds the endgame tablebases (see tablebase.py) by retrograde analysis:
+#   python buildTablebase.py --max-men 4
+# only the canonical positions (see symmetry.py) are solved, as every position has the value of its
+# canonical version. classes are solved from the fewest men up. a class a against b is solved together
+# with b against a, since a move without a removal goes from one to the other; a removal goes to b - 1 against a,
+# which is already solved (or won on the spot when the other player is left with 2 men).
+#
+# for the two classes:
+#   1. every position counts its moves without removal, and looks up the result of its removals
+#   2. positions known from that (no move at all, a removal that wins, every move lost) are queued
+#      by the number of turns to the end of the game
+#   3. the queue is worked through from the shortest results: a lost position makes every position that
+#      can move into it a win in one more turn; a won position takes one move off every position that
+#      can move into it, and a position with no move left that avoids a loss is lost
+#   4. whatever is left is a draw
+import argparse
+import os
+import time
+from array import array
+from itertools import combinations
+
+from bitboard import ADJACENT, FULL, bitsOf, formsMill
+from symmetry import canonical, transformBits
+from tablebase import TABLEBASE_DIR, canonicalIndex, fileName, positionIndex, positionFromIndex, writeTablebase
+
+MAX_TURNS = 254
+
+# the men of side that can be removed
+def removableMen(men):
+    free = men
+    for point in bitsOf(men):
+        if formsMill(men, point):
+            free &= ~(1 << point)
+    return free if free else men
+
+# positionIndex() of every canonical position with a men against b men, sorted
+def canonicalPositions(a, b):
+    indices = []
+    for first in combinations(range(24), a):
+        mine = sum(1 << point for point in first)
+        # the men of the player to move are already canonical in a canonical position
+        if any(transformBits(mine, s) < mine for s in range(1, 16)):
+            continue
+        free = [point for point in range(24) if not mine >> point & 1]
+        for second in combinations(free, b):
+            theirs = sum(1 << point for point in second)
+            if canonical(mine, theirs)[2] == 0:
+                indices.append(positionIndex(mine, theirs))
+    indices.sort()
+    return indices
+
+# solve the classes a against b and b against a, given the solved classes with fewer men in solved[(a, b)]
+# as (indices, slots, values): the canonical positions, the place of each of them, and their values
+def solvePair(a, b, solved):
+    classes = [(a, b)] if a == b else [(a, b), (b, a)]
+    tables = {}
+    remaining = {}
+    cannotLose = {}
+    slowestLoss = {}
+    buckets = [[] for turns in range(MAX_TURNS + 2)]
+    # 1. and 2.
+    for (mineCount, theirsCount) in classes:
+        indices = canonicalPositions(mineCount, theirsCount)
+        slots = {index: slot for slot, index in enumerate(indices)}
+        size = len(indices)
+        tables[(mineCount, theirsCount)] = (indices, slots, bytearray(size))
+        left = array("B", bytes(size))
+        safe = bytearray(size)
+        slowest = bytearray(size)
+        lower = solved.get((theirsCount - 1, mineCount))
+        for slot in range(size):
+            mine, theirs = positionFromIndex(indices[slot], mineCount, theirsCount)
+            empty = FULL & ~(mine | theirs)
+            flying = mineCount == 3
+            # moves into symmetric positions count once, as they are resolved once
+            quiet = set()
+            fastestWin = 0
+            removes = None
+            for source in bitsOf(mine):
+                targets = empty if flying else ADJACENT[source] & empty
+                moved = mine & ~(1 << source)
+                for target in bitsOf(targets):
+                    after = moved | (1 << target)
+                    if not formsMill(after, target):
+                        quiet.add(canonicalIndex(theirs, after))
+                        continue
+                    if theirsCount == 3:
+                        # the other player is left with 2 men
+                        fastestWin = 1
+                        continue
+                    if removes is None:
+                        removes = bitsOf(removableMen(theirs))
+                    for remove in removes:
+                        result = lower[2][lower[1][canonicalIndex(theirs & ~(1 << remove), after)]]
+                        if result == 0:
+                            safe[slot] = 1
+                        elif (result - 1) % 2 == 0:
+                            # the other player loses in result - 1 turns
+                            if fastestWin == 0 or result < fastestWin:
+                                fastestWin = result
+                        else:
+                            slowest[slot] = max(slowest[slot], min(result, MAX_TURNS))
+            left[slot] = min(len(quiet), 255)
+            if fastestWin:
+                # a position with a winning removal can never be lost
+                safe[slot] = 1
+                buckets[fastestWin].append((mineCount, theirsCount, slot))
+            elif not quiet and not safe[slot]:
+                buckets[slowest[slot]].append((mineCount, theirsCount, slot))
+        remaining[(mineCount, theirsCount)] = left
+        cannotLose[(mineCount, theirsCount)] = safe
+        slowestLoss[(mineCount, theirsCount)] = slowest
+    # 3.
+    for turns in range(MAX_TURNS + 1):
+        bucket = buckets[turns]
+        while bucket:
+            mineCount, theirsCount, slot = bucket.pop()
+            indices, slots, value = tables[(mineCount, theirsCount)]
+            if value[slot]:
+                continue
+            value[slot] = turns + 1
+            won = turns % 2 == 1
+            # the positions that move into this one are in the class theirsCount against mineCount,
+            # where the men that just moved belong to the player to move
+            before = (theirsCount, mineCount)
+            beforeSlots, beforeValue = tables[before][1:]
+            beforeLeft = remaining[before]
+            mine, theirs = positionFromIndex(indices[slot], mineCount, theirsCount)
+            empty = FULL & ~(mine | theirs)
+            flying = theirsCount == 3
+            # the positions moving into a symmetric version of this one are symmetric to these,
+            # so the canonical ones among them are all found here, each of them once
+            previous = set()
+            for target in bitsOf(theirs):
+                # a move that closed a mill would have removed a man
+                if formsMill(theirs, target):
+                    continue
+                sources = empty if flying else ADJACENT[target] & empty
+                for source in bitsOf(sources):
+                    previous.add(beforeSlots[canonicalIndex(theirs & ~(1 << target) | (1 << source), mine)])
+            for position in previous:
+                if beforeValue[position]:
+                    continue
+                if not won:
+                    buckets[min(turns + 1, MAX_TURNS)].append((before[0], before[1], position))
+                else:
+                    beforeLeft[position] -= 1
+                    if beforeLeft[position] == 0 and not cannotLose[before][position]:
+                        slowest = max(turns + 1, slowestLoss[before][position])
+                        buckets[min(slowest, MAX_TURNS)].append((before[0], before[1], position))
+    return tables
+
+def main():
+    parser = argparse.ArgumentParser(description = "build the endgame tablebases")
+    parser.add_argument("--max-men", type = int, default = 3, help = "largest number of men of one player")
+    parser.add_argument("--output", default = TABLEBASE_DIR)
+    args = parser.parse_args()
+    os.makedirs(args.output, exist_ok = True)
+    solved = {}
+    for total in range(6, 2 * args.max_men + 1):
+        for a in range(3, args.max_men + 1):
+            b = total - a
+            if b < a or b > args.max_men:
+                continue
+            start = time.time()
+            tables = solvePair(a, b, solved)
+            for key in tables:
+                solved[key] = tables[key]
+                indices, slots, values = tables[key]
+                writeTablebase(os.path.join(args.output, fileName(key[0], key[1])), indices, values)
+                wins = sum(1 for value in values if value and (value - 1) % 2 == 1)
+                losses = sum(1 for value in values if value and (value - 1) % 2 == 0)
+                print(str(key[0]) + " against " + str(key[1]) + ":", len(values), "canonical positions,", wins, "wins,", losses, "losses,", len(values) - wins - losses, "draws", flush = True)
+            print("  solved in", round(time.time() - start, 1), "s", flush = True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# weights of the evaluation of the search (see evaluate in wolflieu.py), written by tuneWeights.py and
+# read when the engine starts. file layout:
+#   header   b"LMEV", version (uint32)
+#   weights  men in the placement phase, men after it, men on a middle position, mobility (int32 each)
+# the weights are in the units of the scores of the search, so a man is worth about 100 in the
+# placement phase. without a file the engine uses the hand picked DEFAULT_WEIGHTS
+import os
+import struct
+
+# where the engine looks for the weights, EVAL_WEIGHTS in the environment changes it
+WEIGHTS_FILE = os.getenv("EVAL_WEIGHTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights.bin"))
+
+MAGIC = b"LMEV"
+VERSION = 1
+HEADER = struct.Struct("<4sI")
+WEIGHTS = struct.Struct("<4i")
+
+NAMES = ["placement men", "men", "centre", "mobility"]
+DEFAULT_WEIGHTS = (100, 50, 10, 5)
+
+# write weights (a sequence of 4 ints in the order of NAMES) into a weights file
+def writeWeights(path, weights):
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION))
+        file.write(WEIGHTS.pack(*weights))
+
+# the weights of the file at path, or DEFAULT_WEIGHTS when there is no file
+def loadWeights(path):
+    if not os.path.exists(path):
+        return DEFAULT_WEIGHTS
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) != HEADER.size + WEIGHTS.size:
+        raise ValueError(path + " is not a weights file")
+    magic, version = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(path + " is not a weights file")
+    return WEIGHTS.unpack_from(data, HEADER.size)
@@ -0,0 +1,67 @@
+# batched evaluation of the frontier of the search: at a node with depth 1 every child would be
+# evaluated one at a time, so instead the positions after all the moves are built as rows of a
+# NumPy array and their evaluation terms are computed together:
+#   children[n, side, p]   1 when side has a man on point p after move n
+#   men                    sum over the points
+#   centre                 product with the CENTRE vector
+#   mobility               the free neighbours of every point are empty @ ADJACENCY, summed over the men
+# NumPy is optional: without it AVAILABLE is False and the search evaluates the children one by one.
+# it takes longer to import than the rest of the engine, so it is only imported by the first batch
+import importlib.util
+
+from geometry import NEIGHBOURS, CENTER_POINTS
+
+AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+numpy = None
+
+# import NumPy and build the tables
+def load():
+    global numpy, ADJACENCY, CENTRE, POINTS
+    import numpy as module
+    # ADJACENCY[p][q] = 1 when p and q are next to each other
+    ADJACENCY = module.zeros((24, 24), dtype = module.int32)
+    for p in range(24):
+        for q in NEIGHBOURS[p]:
+            ADJACENCY[p, q] = 1
+    CENTRE = module.zeros(24, dtype = module.int32)
+    CENTRE[CENTER_POINTS] = 1
+    POINTS = module.arange(24)
+    numpy = module
+
+# evaluation terms of the positions after each of moves of side, as three arrays over the moves:
+# the differences (type 1 minus type -1) in men, men on a middle position and mobility
+def childTerms(board, side, moves):
+    if numpy is None:
+        load()
+    count = len(moves)
+    array = numpy.array(moves, dtype = numpy.int64)
+    rows = numpy.arange(count)
+    pieces = numpy.array(board.pieces, dtype = numpy.int64)
+    children = numpy.repeat(((pieces[:, None] >> POINTS) & 1).astype(numpy.int32)[None], count, axis = 0)
+    # the fields of the packed moves (see bitboard.encodeMove)
+    sources = (array & 31) - 1
+    moving = sources >= 0
+    children[rows[moving], side, sources[moving]] = 0
+    children[rows, side, ((array >> 5) & 31) - 1] = 1
+    removes = (array >> 10) - 1
+    taking = removes >= 0
+    children[rows[taking], 1 - side, removes[taking]] = 0
+    return terms(children)
+
+# evaluation terms of the positions with the men of type 1 and type -1 in the bitboards mine and theirs
+# (two arrays or lists of the same length), like childTerms. tuneWeights.py extracts its features with it
+def positionTerms(mine, theirs):
+    if numpy is None:
+        load()
+    pieces = numpy.stack([numpy.asarray(mine, dtype = numpy.int64), numpy.asarray(theirs, dtype = numpy.int64)], axis = 1)
+    return terms(((pieces[:, :, None] >> POINTS) & 1).astype(numpy.int32))
+
+# the differences in men, centre and mobility of the positions in children (see the top of the file)
+def terms(children):
+    empty = 1 - children[:, 0] - children[:, 1]
+    reach = empty @ ADJACENCY
+    men = children.sum(axis = 2)
+    centre = children @ CENTRE
+    mobility = (children * reach[:, None, :]).sum(axis = 2)
+    return men[:, 0] - men[:, 1], centre[:, 0] - centre[:, 1], mobility[:, 0] - mobility[:, 1]
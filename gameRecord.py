@@ -0,0 +1,53 @@
+# log of the games the bots played, appended to at the end of every game and read by analyze.py.
+# the log is a sequence of game records, so processes playing at the same time can append to one file:
+#   header   version (uint8), colour of the bot (uint8, 0 blue, 1 orange), number of moves (uint16)
+#   moves    every move of the game from the first move of blue on (uint16 each, packed like
+#            bitboard.encodeMove, so the "h1"/"h2" of a placement is the empty from field)
+# a game record is written with one write() on a file opened for appending, so records of games that end
+# at the same time do not get mixed up.
+import os
+import struct
+from array import array
+
+from bitboard import moveToBit, encodeMove
+
+# where the bots log their games: in the data directory of the user ($XDG_DATA_HOME or ~/.local/share),
+# GAME_LOG in the environment changes it ("" turns the log off, server.py and referee.py take it as --log)
+GAME_LOG = os.getenv("GAME_LOG", os.path.join(os.getenv("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share"), "wolflieu", "games.bin"))
+
+VERSION = 1
+HEADER = struct.Struct("<BBH")
+
+# the packed move of the text of a move of either player, like "h1 d3 r0" or "a7 a4 d3"
+def textToMove(text):
+    source, target, remove = text.split()
+    return encodeMove(moveToBit(source), moveToBit(target), moveToBit(remove))
+
+# the bytes of the record of a game the bot played as blue (or orange) with the packed moves
+def encodeGame(blue, moves):
+    return HEADER.pack(VERSION, 0 if blue else 1, len(moves)) + array("H", moves).tobytes()
+
+# append a game to the log at path (nothing when path is "")
+def appendGame(path, blue, moves):
+    if not path or not moves:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+    with open(path, "ab") as file:
+        file.write(encodeGame(blue, moves))
+
+# the games of the log at path, one (blue, moves) at a time, with moves an array of packed moves
+def readGames(path):
+    with open(path, "rb") as file:
+        while True:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            version, colour, count = HEADER.unpack(header)
+            if version != VERSION:
+                raise ValueError(path + " is not a game log")
+            moves = array("H")
+            data = file.read(2 * count)
+            if len(data) < 2 * count:
+                return
+            moves.frombytes(data)
+            yield colour == 0, moves
@@ -0,0 +1,50 @@
+# geometry of the Lasker Morris board, built once at import.
+# this is the only place that knows how the board looks: both wolflieu.py and wolflieuBot.py
+# (and the bitboard masks) are built from these tables.
+#
+# the 24 positions are numbered row by row in the same order as the list board:
+#   a7 d7 g7 / b6 d6 f6 / c5 d5 e5 / a4 b4 c4 e4 f4 g4 / c3 d3 e3 / b2 d2 f2 / a1 d1 g1
+# so board[row][col] of the list board is point ROW_START[row] + col
+
+ROW_START = [0, 3, 6, 9, 15, 18, 21]
+
+NAMES = ["a7", "d7", "g7", "b6", "d6", "f6", "c5", "d5", "e5",
+         "a4", "b4", "c4", "e4", "f4", "g4",
+         "c3", "d3", "e3", "b2", "d2", "f2", "a1", "d1", "g1"]
+
+POINT_OF_NAME = {NAMES[i]: i for i in range(24)}
+
+# [row, col] of each point on the list board
+POINTS = []
+for row in range(7):
+    for col in range(6 if row == 3 else 3):
+        POINTS.append([row, col])
+
+# all the 16 lines of the board, written in order along the line
+LINES = [["a7", "d7", "g7"], ["b6", "d6", "f6"], ["c5", "d5", "e5"], ["a4", "b4", "c4"],
+         ["e4", "f4", "g4"], ["c3", "d3", "e3"], ["b2", "d2", "f2"], ["a1", "d1", "g1"],
+         ["a7", "a4", "a1"], ["b6", "b4", "b2"], ["c5", "c4", "c3"], ["d7", "d6", "d5"],
+         ["d3", "d2", "d1"], ["e5", "e4", "e3"], ["f6", "f4", "f2"], ["g7", "g4", "g1"]]
+
+# MILLS[p] holds the two mills going through p, each as the other two points of the mill
+MILLS = [[] for i in range(24)]
+# NEIGHBOURS[p] holds the points next to p (they follow each other on a line)
+NEIGHBOURS = [[] for i in range(24)]
+for line in LINES:
+    points = [POINT_OF_NAME[name] for name in line]
+    for i in range(3):
+        MILLS[points[i]].append([points[j] for j in range(3) if j != i])
+    for i in range(2):
+        NEIGHBOURS[points[i]].append(points[i + 1])
+        NEIGHBOURS[points[i + 1]].append(points[i])
+
+# the same tables in [row, col] form for the list board, indexed as table[row][col]
+NEIGHBOUR_INDEX = [[] for row in range(7)]
+MILL_INDEX = [[] for row in range(7)]
+for point in range(24):
+    row = POINTS[point][0]
+    NEIGHBOUR_INDEX[row].append([POINTS[other] for other in NEIGHBOURS[point]])
+    MILL_INDEX[row].append([[POINTS[mill[0]], POINTS[mill[1]]] for mill in MILLS[point]])
+
+# positions in the middle of a side, used by the evaluation function
+CENTER_POINTS = [POINT_OF_NAME[name] for name in ["d7", "d6", "d5", "d3", "d2", "d1", "a4", "b4", "c4", "e4", "f4", "g4"]]
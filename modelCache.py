@@ -0,0 +1,134 @@
+# cache of the moves the model (see wolflieuBot.py) answered, kept in an SQLite file between games so a
+# position asked before is answered without a request. a position is stored once for all its 16
+# symmetric versions: the key is the canonical position (see symmetry.py), the colour of the player
+# to move and the men on hand, and the move is stored for the canonical position.
+# only legal moves are stored. when there are more than capacity moves the least recently used go.
+# the counters of hits, misses and the seconds spent on requests add up over all the games:
+#   python modelCache.py                 print them for the default file
+#   python modelCache.py other.sqlite
+import argparse
+import os
+import sqlite3
+
+from symmetry import canonical, transformMove, INVERSE
+from zobrist import handCounts
+
+# where the bot keeps the cache: in the cache directory of the user ($XDG_CACHE_HOME or ~/.cache),
+# MODEL_CACHE in the environment changes it ("" turns the cache off)
+CACHE_FILE = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "wolflieu", "modelCache.sqlite")
+
+# the number of moves kept
+CAPACITY = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS moves (key INTEGER PRIMARY KEY, move INTEGER NOT NULL, used INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS movesUsed ON moves (used);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value REAL NOT NULL);
+"""
+
+COUNTERS = ("hits", "misses", "requests", "requestSeconds")
+
+# key of a position: the canonical men of the player to move and of the other player, the colour
+# of the player to move and the men it has on hand (together they give the turn of the placement phase)
+def cacheKey(mine, theirs, blue, hand):
+    return (((((mine << 24) | theirs) << 1) | blue) << 4) | hand
+
+
+class ModelCache:
+    def __init__(self, path, capacity = CAPACITY):
+        self.capacity = capacity
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.count = self.connection.execute("SELECT COUNT(*) FROM moves").fetchone()[0]
+        # the last used time of the moves is a counter, not the clock
+        self.clock = self.connection.execute("SELECT COALESCE(MAX(used), 0) FROM moves").fetchone()[0]
+        # counters of this process, added to the ones in the file by close()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # the last used time of the moves looked up since the last write, written with the next store()
+        # or by close() so a hit costs no write
+        self.used = {}
+
+    # the key and the symmetry of the canonical version of the position of type 1 at turn
+    def find(self, mine, theirs, turn, blue):
+        mine, theirs, symmetry = canonical(mine, theirs)
+        return cacheKey(mine, theirs, int(blue), handCounts(turn)[0]), symmetry
+
+    # the move stored for the position (see bitboard.encodeMove), or None when it is not in the cache
+    def lookup(self, mine, theirs, turn, blue):
+        key, symmetry = self.find(mine, theirs, turn, blue)
+        row = self.connection.execute("SELECT move FROM moves WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        self.clock += 1
+        self.used[key] = self.clock
+        return transformMove(row[0], INVERSE[symmetry])
+
+    # a request to the model took seconds
+    def request(self, seconds):
+        self.counters["requests"] += 1
+        self.counters["requestSeconds"] += seconds
+
+    # store the legal move the model answered for the position (or the search's move in place of a wrong one)
+    def store(self, mine, theirs, turn, blue, move):
+        key, symmetry = self.find(mine, theirs, turn, blue)
+        self.clock += 1
+        with self.connection:
+            self.writeUsed()
+            if self.connection.execute("SELECT 1 FROM moves WHERE key = ?", (key,)).fetchone() is None:
+                self.count += 1
+            self.connection.execute("INSERT OR REPLACE INTO moves VALUES (?, ?, ?)", (key, transformMove(move, symmetry), self.clock))
+            # forget the least recently used moves
+            if self.count > self.capacity:
+                self.connection.execute("DELETE FROM moves WHERE key IN (SELECT key FROM moves ORDER BY used LIMIT ?)",
+                                        (self.count - self.capacity,))
+                self.count = self.capacity
+
+    # write the last used times of the moves looked up, inside a transaction
+    def writeUsed(self):
+        if self.used:
+            self.connection.executemany("UPDATE moves SET used = ? WHERE key = ?", [(used, key) for key, used in self.used.items()])
+            self.used = {}
+
+    # the counters of all the games, this one included: hits, misses, requests and the seconds they took,
+    # with the hit rate and the seconds the hits saved (at the mean time of a request)
+    def summary(self):
+        summary = dict(self.connection.execute("SELECT name, value FROM counters").fetchall())
+        for name in COUNTERS:
+            summary[name] = summary.get(name, 0) + self.counters[name]
+        lookups = summary["hits"] + summary["misses"]
+        summary["hitRate"] = summary["hits"] / lookups if lookups else 0.0
+        summary["savedSeconds"] = summary["hits"] * summary["requestSeconds"] / summary["requests"] if summary["requests"] else 0.0
+        summary["moves"] = self.count
+        return summary
+
+    # add the counters of this process to the file and close it
+    def close(self):
+        with self.connection:
+            self.writeUsed()
+            for name in COUNTERS:
+                self.connection.execute("INSERT INTO counters VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                                        (name, self.counters[name]))
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "print the counters of the cache of model moves")
+    parser.add_argument("path", nargs = "?", default = CACHE_FILE)
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        parser.error(args.path + " does not exist")
+    cache = ModelCache(args.path)
+    summary = cache.summary()
+    cache.close()
+    print(summary["moves"], "moves,", int(summary["hits"]), "hits,", int(summary["misses"]), "misses,",
+          "hit rate %.1f%%," % (100 * summary["hitRate"]), int(summary["requests"]), "requests in",
+          "%.1f s," % summary["requestSeconds"], "%.1f s saved" % summary["savedSeconds"])
+
+if __name__ == "__main__":
+    main()
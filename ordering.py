@@ -0,0 +1,112 @@
+# move ordering for the alpha beta search. moves are tried in this order:
+#   1. the best move stored in the transposition table (or the principal variation at the root)
+#   2. moves that close a mill, the best removal first
+#   3. moves that block a mill the opponent could close next turn
+#   4. killer moves of the same ply, then the rest by the history table
+# staged() hands them out in that order one stage at a time, so the moves after a cutoff are not generated
+from bitboard import POINT_MILLS, ADJACENT, NO_MOVE
+
+TABLE_MOVE = 1 << 30
+MILL_MOVE = 1 << 29
+BLOCK_MOVE = 1 << 28
+KILLER_MOVE = 1 << 27
+
+MAX_PLY = 128
+
+# how good it is to remove the man of the opponent on point: breaking one of the opponent's
+# open two-in-a-row is worth the most, then the number of free positions next to the man
+def removalValue(opponent, empty, point):
+    value = (ADJACENT[point] & empty).bit_count()
+    for mask in POINT_MILLS[point]:
+        if (opponent & mask).bit_count() == 2 and empty & mask:
+            value += 10
+    return value
+
+# check if putting a man on point stops the opponent from closing a mill there
+def blocksMill(opponent, point):
+    for mask in POINT_MILLS[point]:
+        rest = mask & ~(1 << point)
+        if opponent & rest == rest:
+            return True
+    return False
+
+
+class MoveOrdering:
+    def __init__(self):
+        # two killer moves per ply, and history[side][from + 1][to] for quiet moves
+        self.killers = [[NO_MOVE, NO_MOVE] for ply in range(MAX_PLY)]
+        self.history = [[[0] * 24 for source in range(25)] for side in range(2)]
+
+    # called once per search: forget the killers and age the history
+    def newSearch(self):
+        for ply in range(MAX_PLY):
+            self.killers[ply][0] = NO_MOVE
+            self.killers[ply][1] = NO_MOVE
+        for side in range(2):
+            for row in self.history[side]:
+                for i in range(24):
+                    row[i] >>= 1
+
+    # return the moves of side sorted from the most to the least promising
+    def order(self, board, side, possibleMoves, tableMove, ply):
+        opponent = board.pieces[1 - side]
+        empty = board.empty()
+        scores = {}
+        for move in possibleMoves:
+            if move == tableMove:
+                scores[move] = TABLE_MOVE
+            elif move >> 10:
+                scores[move] = MILL_MOVE + removalValue(opponent, empty, (move >> 10) - 1)
+        quietScores = self.quietScores(opponent, side, [move for move in possibleMoves if move not in scores], ply)
+        scores.update(quietScores)
+        return sorted(possibleMoves, key = scores.__getitem__, reverse = True)
+
+    # scores of the moves without removal: blocks, then killers, then the history
+    def quietScores(self, opponent, side, quiet, ply):
+        killers = self.killers[min(ply, MAX_PLY - 1)]
+        history = self.history[side]
+        scores = {}
+        for move in quiet:
+            target = ((move >> 5) & 31) - 1
+            if blocksMill(opponent, target):
+                scores[move] = BLOCK_MOVE + history[move & 31][target]
+            elif move == killers[0]:
+                scores[move] = KILLER_MOVE + 1
+            elif move == killers[1]:
+                scores[move] = KILLER_MOVE
+            else:
+                scores[move] = history[move & 31][target]
+        return scores
+
+    # the moves of side in the same order as order(), generated one stage at a time: the table move is
+    # tried before any move is generated, and the moves without removal are only scored and sorted
+    # when the mills did not cause a cutoff
+    def staged(self, board, side, turn, tableMove, ply):
+        if tableMove != NO_MOVE and board.isLegal(side, turn, tableMove):
+            yield tableMove
+        mills, quiet = board.splitMoves(side, turn, True)
+        opponent = board.pieces[1 - side]
+        if mills:
+            empty = board.empty()
+            mills.sort(key = lambda move: removalValue(opponent, empty, (move >> 10) - 1), reverse = True)
+            for move in mills:
+                if move != tableMove:
+                    yield move
+        if quiet:
+            scores = self.quietScores(opponent, side, quiet, ply)
+            quiet.sort(key = scores.__getitem__, reverse = True)
+            for move in quiet:
+                if move != tableMove:
+                    yield move
+
+    # a move of side caused a beta cutoff at depth: remember it as a killer and in the history
+    def cutoff(self, side, move, depth, ply):
+        if move >> 10:
+            return
+        killers = self.killers[min(ply, MAX_PLY - 1)]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        history = self.history[side][move & 31]
+        target = ((move >> 5) & 31) - 1
+        history[target] = min(history[target] + depth * depth, KILLER_MOVE - 1)
@@ -0,0 +1,133 @@
+# perft: counts the move sequences of a given length from a set of standard positions, to measure the speed
+# of move generation and check it against the counts of the list board functions of wolflieu.py
+# (checkSpacesState, checkPossibleMoves, checkForMill and checkRemovableSpaces):
+#   python perft.py --depth 4                        the bitboard generator against the stored counts
+#   python perft.py --depth 3 --generator list       the list functions themselves
+# a move that closes a mill counts once for every man it can remove, and a player with fewer than
+# 3 men after the placement phase has no moves. the stalemate counter is left out.
+# REFERENCE holds the counts of the list functions; a new board representation has to reproduce them
+# before it replaces the old one.
+import argparse
+import sys
+import time
+
+from bitboard import Board
+from wolflieu import changeBoardWithIndex, checkForMill, checkSpacesState, checkRemovableSpaces, checkPossibleMoves
+
+EMPTY = [[0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0, 0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0]]
+
+# the standard positions: name, list board with the player to move as 1, and the turn
+POSITIONS = [
+    ("start", EMPTY, 1),
+    ("placement", [[1, 1, 0], [0, -1, 0], [0, 0, 0], [0, -1, 0, 1, 0, 0], [0, 0, 0], [1, 0, -1], [0, -1, 0]], 9),
+    ("movement", [[1, 1, -1], [0, -1, 1], [1, -1, 0], [0, -1, 1, 1, -1, 0], [-1, 0, 0], [1, 0, -1], [1, -1, 0]], 25),
+    ("flying", [[1, 0, 0], [0, 0, 1], [0, 0, 0], [0, -1, 0, 0, -1, 0], [-1, 0, 0], [1, 0, -1], [0, 0, 0]], 40),
+]
+
+# REFERENCE[name][depth - 1]: the count of the list functions from the position name
+REFERENCE = {
+    "start": [24, 552, 12144, 255024, 5140800, 99274176],
+    "placement": [19, 289, 5286, 80616, 1394690, 20743266],
+    "movement": [5, 49, 347, 4150, 32653, 384716, 3242756, 36292116],
+    "flying": [51, 418, 21624, 200847, 10467090, 158484859],
+}
+
+# all the moves of type as (from, to, remove) with [row, col] positions and None for no from or no remove,
+# found with the list board functions
+def listMoves(board, type, turn):
+    moves = []
+    if turn <= 20:
+        sources = [None]
+    else:
+        sources = checkSpacesState(board, type)
+    flying = turn > 20 and len(sources) == 3
+    for source in sources:
+        if source is None or flying:
+            targets = checkSpacesState(board, 0)
+        else:
+            targets = checkPossibleMoves(board, source[0], source[1])
+        for target in targets:
+            if source is not None:
+                changeBoardWithIndex(board, source[0], source[1], 0)
+            changeBoardWithIndex(board, target[0], target[1], type)
+            if checkForMill(board, target[0], target[1], type):
+                for remove in checkRemovableSpaces(board, -type):
+                    moves.append((source, target, remove))
+            else:
+                moves.append((source, target, None))
+            changeBoardWithIndex(board, target[0], target[1], 0)
+            if source is not None:
+                changeBoardWithIndex(board, source[0], source[1], type)
+    return moves
+
+def listPerft(board, type, turn, depth):
+    if turn > 20 and len(checkSpacesState(board, type)) < 3:
+        return 0
+    moves = listMoves(board, type, turn)
+    if depth == 1:
+        return len(moves)
+    count = 0
+    for source, target, remove in moves:
+        if source is not None:
+            changeBoardWithIndex(board, source[0], source[1], 0)
+        changeBoardWithIndex(board, target[0], target[1], type)
+        if remove is not None:
+            changeBoardWithIndex(board, remove[0], remove[1], 0)
+        count += listPerft(board, -type, turn + 1, depth - 1)
+        if remove is not None:
+            changeBoardWithIndex(board, remove[0], remove[1], -type)
+        changeBoardWithIndex(board, target[0], target[1], 0)
+        if source is not None:
+            changeBoardWithIndex(board, source[0], source[1], type)
+    return count
+
+def bitboardPerft(board, side, turn, depth):
+    if turn > 20 and board.men[side] < 3:
+        return 0
+    moves = board.generateMoves(side, turn)
+    if depth == 1:
+        return len(moves)
+    count = 0
+    for move in moves:
+        board.makeMove(side, move)
+        count += bitboardPerft(board, 1 - side, turn + 1, depth - 1)
+        board.undoMove(side, move)
+    return count
+
+# the count from the list board of the position with the given generator
+def perft(generator, board, turn, depth):
+    if generator == "list":
+        return listPerft([row[:] for row in board], 1, turn, depth)
+    return bitboardPerft(Board.fromList(board), 0, turn, depth)
+
+def main():
+    parser = argparse.ArgumentParser(description = "count the move sequences from the standard positions")
+    parser.add_argument("--depth", type = int, default = 3)
+    parser.add_argument("--generator", choices = ("bitboard", "list"), default = "bitboard")
+    args = parser.parse_args()
+
+    failed = False
+    total = 0
+    seconds = 0.0
+    for name, board, turn in POSITIONS:
+        for depth in range(1, args.depth + 1):
+            start = time.perf_counter()
+            count = perft(args.generator, board, turn, depth)
+            elapsed = time.perf_counter() - start
+            total += count
+            seconds += elapsed
+            reference = REFERENCE.get(name, [])
+            if depth > len(reference):
+                check = "no reference"
+            elif count == reference[depth - 1]:
+                check = "ok"
+            else:
+                check = "WRONG, expected " + str(reference[depth - 1])
+                failed = True
+            print(name, "depth", depth, ":", count, "in", "%.3f" % elapsed, "s,", int(count / max(elapsed, 1e-9)), "nodes/s,", check, flush = True)
+    print("total", total, "in", "%.2f" % seconds, "s,", int(total / max(seconds, 1e-9)), "nodes/s")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# local referee: plays games between engines the way the real referee does, and runs tournaments
+# across a pool of processes to measure changes to the engine:
+#   python referee.py wolflieu random --games 200 --workers 8 --time 0.2
+#   python referee.py wolflieu "python ../baseline/wolflieu.py" --games 100 --workers 4
+# an engine is one of
+#   wolflieu    makeMove of wolflieu.py, run inside the worker process with --time seconds per move
+#   random      makeRandomMove of wolflieu.py
+#   server:ADDRESS  a game on server.py listening at host:port or at the path of a unix socket
+#   anything else is a command that starts an engine speaking the referee protocol on stdin and stdout
+#               ("blue" or "orange" first, then one move like "h1 d3 r0" per line), like main() does
+# the rules are the ones the engine plays by: turns 1 to 20 place a man (blue on odd turns), after that
+# men move to an adjacent empty position, or anywhere with 3 men left. closing a mill removes a man of the
+# other player. a player with fewer than 3 men after the placement phase, or without a move, loses, and
+# the game is a draw when 20 turns pass without a removal (counted from turn 21 like main() does).
+# an illegal move, a move that takes longer than --limit, or no answer at all loses the game.
+# --log appends every game to a game log (see gameRecord.py) for analyze.py.
+import argparse
+import math
+import random
+import select
+import shlex
+import socket
+import subprocess
+import time
+from multiprocessing import Pool
+
+from bitboard import Board, bitToMove, moveToBit, encodeMove, decodeMove
+from gameRecord import textToMove, appendGame
+
+# results, for the blue player
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+
+# an engine running in the referee's process: function(board, turn, lastChanged, isBlue) returns the
+# text of its move, with the list board seen from the engine (its men are 1)
+class FunctionEngine:
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+
+    def start(self, isBlue):
+        self.isBlue = isBlue
+
+    def move(self, board, turn, lastChanged, timeLimit):
+        return self.function(board, turn, lastChanged, self.isBlue)
+
+    def opponentMoved(self, text):
+        pass
+
+    def close(self):
+        pass
+
+
+# an engine in its own process, which keeps track of the game itself from the moves it is sent
+class ProcessEngine:
+    def __init__(self, name, command):
+        self.name = name
+        self.command = shlex.split(command)
+        self.process = None
+
+    def start(self, isBlue):
+        self.process = subprocess.Popen(self.command, stdin = subprocess.PIPE, stdout = subprocess.PIPE,
+                                        stderr = subprocess.DEVNULL, text = True, bufsize = 1)
+        self.send("blue" if isBlue else "orange")
+
+    def send(self, line):
+        try:
+            self.process.stdin.write(line + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            pass
+
+    # the next line the engine prints, or None when it does not answer within timeLimit seconds
+    def move(self, board, turn, lastChanged, timeLimit):
+        ready, unused, unused = select.select([self.process.stdout], [], [], timeLimit)
+        if not ready:
+            return None
+        line = self.process.stdout.readline()
+        return line.strip() or None
+
+    def opponentMoved(self, text):
+        self.send(text)
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout = 2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+
+# a game on an engine server (see server.py) at address, host:port or the path of a unix socket
+class SocketEngine:
+    def __init__(self, name, address):
+        self.name = name
+        self.address = address
+        self.connection = None
+
+    def start(self, isBlue):
+        if "/" in self.address:
+            self.connection = socket.socket(socket.AF_UNIX)
+            self.connection.connect(self.address)
+        else:
+            host, port = self.address.rsplit(":", 1)
+            self.connection = socket.create_connection((host, int(port)))
+        self.file = self.connection.makefile("rw", buffering = 1)
+        self.send("blue" if isBlue else "orange")
+
+    def send(self, line):
+        try:
+            self.file.write(line + "\n")
+            self.file.flush()
+        except OSError:
+            pass
+
+    # the next line the server sends, or None when it does not answer within timeLimit seconds
+    def move(self, board, turn, lastChanged, timeLimit):
+        ready, unused, unused = select.select([self.connection], [], [], timeLimit)
+        if not ready:
+            return None
+        line = self.file.readline()
+        return line.strip() or None
+
+    def opponentMoved(self, text):
+        self.send(text)
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.file.close()
+        self.connection.close()
+        self.connection = None
+
+
+# the engine described by spec (see the top of the file)
+def makeEngine(spec, moveTime):
+    if spec == "wolflieu":
+        import wolflieu
+        return FunctionEngine(spec, lambda board, turn, lastChanged, isBlue: wolflieu.makeMove(board, turn, lastChanged, isBlue, moveTime))
+    if spec == "random":
+        import wolflieu
+        return FunctionEngine(spec, lambda board, turn, lastChanged, isBlue: wolflieu.makeRandomMove(board, turn, isBlue))
+    if spec.startswith("server:"):
+        return SocketEngine(spec, spec[len("server:"):])
+    return ProcessEngine(spec, spec)
+
+# the move (see bitboard.encodeMove) in the text of a move by side, or None when the text is not a move
+def parseMove(text, side, turn):
+    parts = text.split()
+    if len(parts) != 3:
+        return None
+    if turn <= 20:
+        if parts[0] != ("h1" if side == 0 else "h2"):
+            return None
+        source = -1
+    else:
+        source = moveToBit(parts[0])
+        if source == -1:
+            return None
+    target = moveToBit(parts[1])
+    if target == -1:
+        return None
+    remove = -1
+    if parts[2] != "r0":
+        remove = moveToBit(parts[2])
+        if remove == -1:
+            return None
+    return encodeMove(source, target, remove)
+
+# the text of a move by side
+def moveText(move, side):
+    source, target, remove = decodeMove(move)
+    first = ("h1" if side == 0 else "h2") if source == -1 else bitToMove(source)
+    return first + " " + bitToMove(target) + " " + ("r0" if remove == -1 else bitToMove(remove))
+
+# play one game of blue against orange. the first openingPlies moves are picked at random by the referee
+# (only engines in the referee's process can play on from there). returns a dict with the result for
+# blue, the reason the game ended, the moves, and the seconds each move took for each player
+def playGame(blue, orange, openingPlies = 0, seed = None, moveLimit = None):
+    rng = random.Random(seed)
+    engines = [blue, orange]
+    board = Board()
+    turn = 1
+    lastChanged = 21
+    moves = []
+    latency = [[], []]
+    for engine, isBlue in ((blue, True), (orange, False)):
+        engine.start(isBlue)
+    try:
+        while True:
+            side = (turn - 1) % 2
+            if turn > 20 and board.men[side] < 3:
+                result, reason = -1, "fewer than 3 men"
+                break
+            if turn - lastChanged == 20:
+                result, reason = 0, "20 turns without a removal"
+                break
+            legal = board.generateMoves(side, turn)
+            if not legal:
+                result, reason = -1, "no move"
+                break
+            if turn <= openingPlies:
+                move = rng.choice(legal)
+                text = moveText(move, side)
+            else:
+                # the engine sees its own men as 1
+                view = Board(board.pieces[side], board.pieces[1 - side]).toList()
+                started = time.perf_counter()
+                text = engines[side].move(view, turn, lastChanged, moveLimit)
+                latency[side].append(time.perf_counter() - started)
+                if text is None:
+                    result, reason = -1, "no answer"
+                    break
+                if moveLimit is not None and latency[side][-1] > moveLimit:
+                    result, reason = -1, "out of time"
+                    break
+                move = parseMove(text, side, turn)
+                if move not in legal:
+                    result, reason = -1, "illegal move " + text
+                    break
+                # the other engine gets the move the way the engine writes it, whatever the spacing
+                text = moveText(move, side)
+            board.makeMove(side, move)
+            moves.append(text)
+            engines[1 - side].opponentMoved(text)
+            if turn > 20 and move >> 10:
+                lastChanged = turn
+            turn += 1
+    finally:
+        for engine in engines:
+            engine.close()
+    # result is for the player to move when the game ended
+    if side == 1:
+        result = -result
+    return {"result": result, "reason": reason, "moves": moves, "latency": latency}
+
+# Elo difference for a score of wins, draws and losses, with the half width of its 95% interval
+def eloDifference(wins, draws, losses):
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    deviation = math.sqrt((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games / games)
+
+    def elo(score):
+        if score <= 0:
+            return -math.inf
+        if score >= 1:
+            return math.inf
+        return -400 * math.log10(1 / score - 1)
+
+    if score in (0, 1):
+        return elo(score), math.inf
+    low = elo(score - 1.96 * deviation)
+    high = elo(score + 1.96 * deviation)
+    return elo(score), (high - low) / 2
+
+# the value at fraction (0 to 1) of the sorted list values
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+# settings and engines of each worker process of a tournament
+def setup(specs, moveTime, openingPlies, moveLimit, seed, log):
+    global engines, settings
+    engines = [makeEngine(spec, moveTime) for spec in specs]
+    settings = (openingPlies, moveLimit, seed, log)
+
+# play game number index of the tournament, the engines take turns being blue.
+# returns the result for the first engine, the reason, the number of moves and the move times of both engines
+def tournamentGame(index):
+    openingPlies, moveLimit, seed, log = settings
+    first, second = engines
+    firstBlue = index % 2 == 0
+    # both colours of a pair of games start from the same opening
+    gameSeed = repr((seed, index // 2))
+    random.seed(repr((seed, index)))
+    if firstBlue:
+        game = playGame(first, second, openingPlies, gameSeed, moveLimit)
+    else:
+        game = playGame(second, first, openingPlies, gameSeed, moveLimit)
+    # the log is of the first engine
+    appendGame(log, firstBlue, [textToMove(text) for text in game["moves"]])
+    if firstBlue:
+        return game["result"], game["reason"], len(game["moves"]), game["latency"][0], game["latency"][1]
+    return -game["result"], game["reason"], len(game["moves"]), game["latency"][1], game["latency"][0]
+
+def main():
+    parser = argparse.ArgumentParser(description = "play a tournament between two engines")
+    parser.add_argument("first", help = "wolflieu, random, server:ADDRESS, or the command that starts an engine")
+    parser.add_argument("second", help = "wolflieu, random, server:ADDRESS, or the command that starts an engine")
+    parser.add_argument("--games", type = int, default = 100)
+    parser.add_argument("--workers", type = int, default = 1, help = "number of games played at the same time")
+    parser.add_argument("--time", type = float, default = 0.2, help = "seconds per move of the wolflieu engine")
+    parser.add_argument("--limit", type = float, default = None, help = "a move taking longer than this loses the game")
+    parser.add_argument("--opening-plies", type = int, default = None,
+                        help = "random moves at the start of every game (default 2, 0 with engine commands and servers)")
+    parser.add_argument("--seed", type = int, default = 4341)
+    parser.add_argument("--log", default = None, help = "append every game to this game log")
+    args = parser.parse_args()
+
+    specs = [args.first, args.second]
+    external = [spec not in ("wolflieu", "random") for spec in specs]
+    openingPlies = args.opening_plies
+    if openingPlies is None:
+        openingPlies = 0 if any(external) else 2
+    if openingPlies and any(external):
+        parser.error("engines started by a command or on a server can only play from the start of the game")
+
+    start = time.time()
+    wins = draws = losses = 0
+    reasons = {}
+    plies = 0
+    latency = [[], []]
+    with Pool(args.workers, initializer = setup, initargs = (specs, args.time, openingPlies, args.limit, args.seed, args.log)) as pool:
+        for result, reason, moves, firstLatency, secondLatency in pool.imap_unordered(tournamentGame, range(args.games)):
+            if result == WIN:
+                wins += 1
+            elif result == LOSS:
+                losses += 1
+            else:
+                draws += 1
+            reasons[reason] = reasons.get(reason, 0) + 1
+            plies += moves
+            latency[0] += firstLatency
+            latency[1] += secondLatency
+            played = wins + draws + losses
+            if played % 10 == 0:
+                print(played, "games,", wins, "wins,", draws, "draws,", losses, "losses", flush = True)
+    seconds = time.time() - start
+
+    played = wins + draws + losses
+    print(played, "games in", round(seconds, 1), "s:", round(played / seconds, 2), "games/s,", round(plies / played, 1), "moves per game")
+    print(args.first, "against", args.second + ":", wins, "wins,", draws, "draws,", losses, "losses")
+    elo, margin = eloDifference(wins, draws, losses)
+    print("Elo difference:", "%+.1f" % elo, "+/-", "%.1f" % margin, "(95%)")
+    for spec, times in zip(specs, latency):
+        times.sort()
+        spread = ["p" + str(fraction) + " %.3f s" % percentile(times, fraction / 100) for fraction in (50, 90, 99)]
+        print(spec, "move time:", ", ".join(spread + ["max %.3f s" % (times[-1] if times else 0.0)]))
+    for reason in sorted(reasons):
+        print(" ", reasons[reason], reason)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# engine server: plays many games at the same time over a local socket, so the imports, the opening
+# book, the tablebases and the transposition table are set up once instead of once per game:
+#   python server.py --port 4341 --workers 8
+#   python server.py --unix /tmp/wolflieu.sock
+#   python referee.py server:127.0.0.1:4341 random --games 200 --workers 8
+# every connection is one game and speaks the protocol of main() in wolflieu.py: the client sends "blue"
+# or "orange", then the server and the client take turns sending one move like "h1 d3 r0" per line.
+# the server closes the connection when the game is over, or when the client sends an illegal move.
+# every game is appended to the game log (see gameRecord.py), --log "" turns it off.
+# the games run on one asyncio event loop and their searches on a shared pool of worker processes.
+# the workers share one transposition table in shared memory (like the parallel search, see
+# wolflieu.setWorkers), and the book and tablebase files are mapped into memory, so every game benefits
+# from what the others searched. there is no pondering: the time of the opponent goes to the other games.
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import wolflieu
+from bitboard import Board
+from gameRecord import GAME_LOG, textToMove, appendGame
+from referee import parseMove, moveText
+from transposition import TranspositionTable, tableBytes, attachMemory
+
+# size of the shared transposition table in MB
+TABLE_SIZE_MB = 64
+
+
+# settings of each worker process: the shared transposition table, and the seconds per move
+# (None for the time of wolflieu.clock)
+def setup(memoryName, sizeMB, moveTime):
+    global memory, timeLimit
+    # Ctrl-C stops the server, which then shuts the workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    memory = attachMemory(memoryName)
+    wolflieu.table = TranspositionTable(sizeMB, memory.buf)
+    timeLimit = moveTime
+
+# the text of the move of type 1 on the list board, searched in a worker process. age is the age of the
+# table entries this search stores, and start is time.time() when the move was asked for
+def searchTask(board, turn, lastChanged, isBlue, age, start):
+    wolflieu.table.age = age
+    return wolflieu.makeMove(board, turn, lastChanged, isBlue, timeLimit, start)
+
+
+class EngineServer:
+    def __init__(self, workers, sizeMB, moveTime, log = GAME_LOG):
+        self.log = log
+        self.memory = shared_memory.SharedMemory(create = True, size = tableBytes(sizeMB))
+        table = TranspositionTable(sizeMB, self.memory.buf)
+        table.clear()
+        table.release()
+        # forked workers would inherit the sockets of the games open when they start, and keep them open
+        # after the game closed them, so they start from a clean fork server instead
+        self.pool = ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context("forkserver"),
+                                        initializer = setup, initargs = (self.memory.name, sizeMB, moveTime))
+        # the age of the next search, counted over all the games
+        self.age = 0
+        self.games = 0
+        self.playing = 0
+
+    # play one game with the client on reader and writer, like main() in wolflieu.py
+    async def playGame(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        self.games += 1
+        self.playing += 1
+        number = self.games
+        board = [[0, 0, 0],[0, 0, 0],[0, 0, 0],[0, 0, 0, 0, 0, 0],[0, 0, 0],[0, 0, 0],[0, 0, 0]]
+        turns = 0
+        lastChanged = 21
+        blue = True
+        record = []
+        try:
+            line = await reader.readline()
+            blue = line.strip() == b"blue"
+            myTurn = blue
+            while True:
+                if myTurn:
+                    turns += 1
+                    self.age = (self.age + 1) & 255
+                    move = await loop.run_in_executor(self.pool, searchTask, board, turns, lastChanged, blue, self.age, time.time())
+                    # the game is over, the client ends it
+                    if move in ("I won", "I lost", "draw"):
+                        break
+                    writer.write(move.encode() + b"\n")
+                    await writer.drain()
+                    record.append(textToMove(move))
+                    board = wolflieu.changeBoard(board, move, 1)
+                else:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    move = line.decode().strip()
+                    turns += 1
+                    # the client is the other colour, and its men are type -1 of the board
+                    packed = parseMove(move, 1 if blue else 0, turns)
+                    if packed is None or not Board.fromList(board).isLegal(1, turns, packed):
+                        print("game", number, "illegal move", repr(move), "at turn", turns, file = sys.stderr, flush = True)
+                        break
+                    # the move as the engine writes it, whatever the spacing of the client
+                    move = moveText(packed, 1 if blue else 0)
+                    board = wolflieu.changeBoard(board, move, -1)
+                    record.append(packed)
+                myTurn = not myTurn
+                if turns > 20:
+                    if move[7] != "0":
+                        lastChanged = turns
+        except (ConnectionError, UnicodeDecodeError):
+            # the client went away or sent something that is not text
+            pass
+        finally:
+            self.playing -= 1
+            writer.close()
+            appendGame(self.log, blue, record)
+            print("game", number, "over after", turns, "turns,", self.playing, "games playing", file = sys.stderr, flush = True)
+
+    def close(self):
+        self.pool.shutdown()
+        self.memory.close()
+        self.memory.unlink()
+
+
+async def serve(args):
+    engine = EngineServer(args.workers, args.table, args.time, args.log)
+    listening = False
+    try:
+        if args.unix:
+            server = await asyncio.start_unix_server(engine.playGame, path = args.unix)
+            listening = True
+        else:
+            server = await asyncio.start_server(engine.playGame, host = args.host, port = args.port)
+        print("serving on", args.unix or (args.host + ":" + str(args.port)), "with", args.workers, "workers", file = sys.stderr, flush = True)
+        async with server:
+            await server.serve_forever()
+    finally:
+        engine.close()
+        # a socket file left behind would keep the next server from listening on it
+        if listening and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+def main():
+    parser = argparse.ArgumentParser(description = "play many games at the same time over a local socket")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 4341)
+    parser.add_argument("--unix", default = None, help = "listen on this unix socket instead of a port")
+    parser.add_argument("--workers", type = int, default = os.cpu_count(), help = "number of processes searching")
+    parser.add_argument("--table", type = int, default = TABLE_SIZE_MB, help = "size of the shared transposition table in MB")
+    parser.add_argument("--time", type = float, default = None, help = "seconds per move (default: the time manager's)")
+    parser.add_argument("--log", default = GAME_LOG, help = "append every game to this game log (\"\" for none)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
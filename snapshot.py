@@ -0,0 +1,64 @@
+# snapshots of the tables modules precompute when they are imported (the symmetries of the board and
+# the Zobrist keys), so a new process reads them in one go instead of building them again.
+# a snapshot holds the tables in marshal format with a checksum of the Python version and of the source
+# files that build them. when a source changed the tables are built again and the snapshot is rewritten
+# for the next process. a directory that cannot be written only costs the time to build the tables.
+#   python snapshot.py      build all the snapshots ahead of time
+import marshal
+import os
+import sys
+import zlib
+
+# where the snapshots are kept: in the cache directory of the user ($XDG_CACHE_HOME or ~/.cache),
+# SNAPSHOT_DIR in the environment changes it
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR") or os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "wolflieu", "snapshots")
+
+# the modules that keep their tables in snapshots
+MODULES = ["symmetry", "zobrist"]
+
+# checksum of the Python version (marshal changes between versions) and of the files at paths
+def checksum(paths):
+    value = zlib.crc32(sys.version.encode())
+    for path in paths:
+        with open(path, "rb") as file:
+            value = zlib.crc32(file.read(), value)
+    return value
+
+# the tables of name: from its snapshot when it was built from the current sources, otherwise from build()
+def load(name, sources, build):
+    path = os.path.join(SNAPSHOT_DIR, name + ".snapshot")
+    check = checksum(sources)
+    try:
+        with open(path, "rb") as file:
+            # reading the whole file first is much faster than marshal.load reading it bit by bit
+            stored, tables = marshal.loads(file.read())
+        if stored == check:
+            return tables
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    tables = build()
+    save(path, (check, tables))
+    return tables
+
+# write a snapshot, through a temporary file so processes starting at the same time never read half of it
+def save(path, snapshot):
+    temporary = path + "." + str(os.getpid())
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok = True)
+        with open(temporary, "wb") as file:
+            marshal.dump(snapshot, file)
+        os.replace(temporary, path)
+    except OSError:
+        pass
+
+def main():
+    for name in MODULES:
+        path = os.path.join(SNAPSHOT_DIR, name + ".snapshot")
+        if os.path.exists(path):
+            os.remove(path)
+    for name in MODULES:
+        __import__(name)
+        print("built", os.path.join(SNAPSHOT_DIR, name + ".snapshot"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# startup benchmark of the entry points: starts each one like the referee does, sends "blue" and measures
+# the seconds until its first move arrives. MOVE_LIMIT=0 leaves no time to search, so the move is the
+# book move or the depth 1 search and the time is what it takes the program to start. a referee with
+# a tight clock on the first move sees exactly this:
+#   python startup.py                      both bots, 10 runs each
+#   python startup.py --runs 20 --max 0.5  exits with 1 when the median of a bot is over 0.5 seconds
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = ["wolflieu.py", "wolflieuBot.py"]
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# seconds from starting the entry point until it prints its first move as blue
+def firstMoveTime(entry):
+    # no time to search, no cache of model moves and no game log
+    environment = dict(os.environ, MOVE_LIMIT = "0", MODEL_CACHE = "", GAME_LOG = "")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(DIRECTORY, entry)], stdin = subprocess.PIPE, stdout = subprocess.PIPE,
+                               stderr = subprocess.DEVNULL, text = True, env = environment, cwd = DIRECTORY)
+    process.stdin.write("blue\n")
+    process.stdin.flush()
+    line = process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    process.stdin.close()
+    process.wait()
+    if not line.strip():
+        raise RuntimeError(entry + " did not answer")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description = "measure how long the bots take to start")
+    parser.add_argument("entries", nargs = "*", default = ENTRY_POINTS)
+    parser.add_argument("--runs", type = int, default = 10)
+    parser.add_argument("--max", type = float, default = None, help = "fail when a median is over this many seconds")
+    args = parser.parse_args()
+
+    # the first run writes the snapshots and the compiled modules the later runs use
+    for entry in args.entries:
+        firstMoveTime(entry)
+    failed = False
+    for entry in args.entries:
+        times = sorted(firstMoveTime(entry) for run in range(args.runs))
+        median = statistics.median(times)
+        check = ""
+        if args.max is not None:
+            if median > args.max:
+                check = ", OVER " + str(args.max) + " s"
+                failed = True
+            else:
+                check = ", ok"
+        print(entry + ": median %.3f s, min %.3f s, max %.3f s" % (median, times[0], times[-1]) + check, flush = True)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# the 16 symmetries of the board: the 4 rotations, each with or without a reflection,
+# each with or without swapping the inner and the outer ring.
+# a position and all its symmetric versions have the same value, so the transposition table, the
+# opening book and the tablebases only keep one of them: the canonical one, the version with the
+# smallest (mine, theirs) bitboards (the table picks it by the smallest of the 16 Zobrist keys instead,
+# see Board.canonicalHash). a move found for the canonical version is brought back with INVERSE[s].
+import geometry
+import snapshot
+from geometry import POINT_OF_NAME, LINES
+
+# the three rings, each going around clockwise from its top left corner
+RINGS = [["a7", "d7", "g7", "g4", "g1", "d1", "a1", "a4"],
+         ["b6", "d6", "f6", "f4", "f2", "d2", "b2", "b4"],
+         ["c5", "d5", "e5", "e4", "e3", "d3", "c3", "c4"]]
+
+# the tables of the symmetries (see below), built when there is no snapshot of them (see snapshot.py)
+def buildTables():
+    # PERMUTATIONS[s][p] is where symmetry s sends point p, symmetry 0 is the identity
+    permutations = []
+    for s in range(16):
+        swap = s >= 8
+        mirror = s % 8 >= 4
+        turns = s % 4
+        permutation = [0] * 24
+        for ring in range(3):
+            for k in range(8):
+                newRing = 2 - ring if swap else ring
+                newK = ((-k if mirror else k) + 2 * turns) % 8
+                permutation[POINT_OF_NAME[RINGS[ring][k]]] = POINT_OF_NAME[RINGS[newRing][newK]]
+        permutations.append(permutation)
+
+    # INVERSE[s] is the symmetry that undoes s
+    inverse = []
+    for s in range(16):
+        for t in range(16):
+            if all(permutations[t][permutations[s][p]] == p for p in range(24)):
+                inverse.append(t)
+                break
+
+    # every symmetry has to send the lines of the board onto lines
+    lines = set(frozenset(POINT_OF_NAME[name] for name in line) for line in LINES)
+    for permutation in permutations:
+        assert set(frozenset(permutation[p] for p in line) for line in lines) == lines
+
+    # BYTE_TABLES[s][i][b]: the bitboard that byte i of a bitboard with value b becomes under s
+    byteTables = []
+    for permutation in permutations:
+        tables = []
+        for i in range(3):
+            table = []
+            for value in range(256):
+                mask = 0
+                for bit in range(8):
+                    if value >> bit & 1:
+                        mask |= 1 << permutation[8 * i + bit]
+                table.append(mask)
+            tables.append(table)
+        byteTables.append(tables)
+
+    # FIELD_TABLES[s][f]: a 5 bit field of a move (point + 1, 0 for none, see bitboard.encodeMove) under s
+    fieldTables = [[0] + [permutation[point] + 1 for point in range(24)] for permutation in permutations]
+    return permutations, inverse, byteTables, fieldTables
+
+PERMUTATIONS, INVERSE, BYTE_TABLES, FIELD_TABLES = snapshot.load("symmetry", [__file__, geometry.__file__], buildTables)
+
+# apply symmetry s to a bitboard
+def transformBits(mask, s):
+    tables = BYTE_TABLES[s]
+    return tables[0][mask & 255] | tables[1][(mask >> 8) & 255] | tables[2][mask >> 16]
+
+# apply symmetry s to a move, no move stays no move
+def transformMove(move, s):
+    table = FIELD_TABLES[s]
+    return table[move & 31] | (table[(move >> 5) & 31] << 5) | (table[move >> 10] << 10)
+
+# the canonical version of a position: returns (mine, theirs, s) where s is the symmetry
+# that turns the position into its canonical version (INVERSE[s] turns it back)
+def canonical(mine, theirs):
+    best = (mine, theirs, 0)
+    for s in range(1, 16):
+        tables = BYTE_TABLES[s]
+        newMine = tables[0][mine & 255] | tables[1][(mine >> 8) & 255] | tables[2][mine >> 16]
+        if newMine > best[0]:
+            continue
+        newTheirs = tables[0][theirs & 255] | tables[1][(theirs >> 8) & 255] | tables[2][theirs >> 16]
+        if newMine < best[0] or newTheirs < best[1]:
+            best = (newMine, newTheirs, s)
+    return best
@@ -0,0 +1,158 @@
+# endgame tablebases: the exact result of every position where nobody has men on hand any more
+# and both players have only a few men left, computed by buildTablebase.py with retrograde analysis.
+# there is one file per material class, tb_<a>_<b>.bin for a men of the player to move against b men
+# of the other player. only canonical positions (see symmetry.py) are stored, the others are looked up
+# through their canonical version:
+#   header   b"LMTB", version (uint32), number of positions (uint64)
+#   indices  positionIndex() of every canonical position of the class, sorted (uint32 each)
+#   values   one byte per position, in the same order:
+#   0       draw
+#   n > 0   the game ends n - 1 turns from now with best play, a win for the player to move
+#           when n - 1 is odd and a loss when it is even (0 turns: the player to move cannot move)
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from symmetry import canonical
+
+# where the engine looks for the tablebase files
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+
+# COMB[n][k] = n choose k
+COMB = [[0] * 25 for n in range(25)]
+for n in range(25):
+    COMB[n][0] = 1
+    for k in range(1, n + 1):
+        COMB[n][k] = COMB[n - 1][k - 1] + COMB[n - 1][k]
+
+MAGIC = b"LMTB"
+VERSION = 1
+HEADER = struct.Struct("<4sIQ")
+
+def fileName(a, b):
+    return "tb_" + str(a) + "_" + str(b) + ".bin"
+
+# number of positions with a men against b men
+def classSize(a, b):
+    return COMB[24][a] * COMB[24 - a][b]
+
+# number of the position in its class: the colex rank of the men of the player to move, then the colex
+# rank of the other men among the positions left empty by the first ones
+def positionIndex(mine, theirs):
+    rank = 0
+    count = 0
+    men = mine
+    while men:
+        low = men & -men
+        count += 1
+        rank += COMB[low.bit_length() - 1][count]
+        men ^= low
+    second = 0
+    other = 0
+    men = theirs
+    while men:
+        low = men & -men
+        other += 1
+        second += COMB[low.bit_length() - 1 - (mine & (low - 1)).bit_count()][other]
+        men ^= low
+    return rank * COMB[24 - count][other] + second
+
+# the k points numbered by rank in colex order among n points, as a list from the highest
+def _unrank(rank, k, n):
+    points = []
+    while k > 0:
+        n -= 1
+        while COMB[n][k] > rank:
+            n -= 1
+        points.append(n)
+        rank -= COMB[n][k]
+        k -= 1
+    return points
+
+# the position (mine, theirs) numbered index in the class a against b
+def positionFromIndex(index, a, b):
+    first, second = divmod(index, COMB[24 - a][b])
+    mine = 0
+    for point in _unrank(first, a, 24):
+        mine |= 1 << point
+    free = [point for point in range(24) if not mine >> point & 1]
+    theirs = 0
+    for point in _unrank(second, b, 24 - a):
+        theirs |= 1 << free[point]
+    return mine, theirs
+
+# positionIndex() of the canonical version of a position
+def canonicalIndex(mine, theirs):
+    mine, theirs, s = canonical(mine, theirs)
+    return positionIndex(mine, theirs)
+
+# write a tablebase file for the canonical positions numbered indices (sorted) with their values
+def writeTablebase(path, indices, values):
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(indices)))
+        file.write(array("I", indices).tobytes())
+        file.write(values)
+
+# split a stored value into (result, turns): result is 1 for a win of the player to move, -1 for a loss, 0 for a draw
+def decodeValue(value):
+    if value == 0:
+        return 0, 0
+    turns = value - 1
+    return (1 if turns % 2 == 1 else -1), turns
+
+
+class Tablebases:
+    # open every tablebase file found in directory
+    def __init__(self, directory = TABLEBASE_DIR):
+        self.files = {}
+        self.maps = {}
+        self.tables = {}
+        self.maxMen = 0
+        if not os.path.isdir(directory):
+            return
+        for a in range(3, 13):
+            for b in range(3, 13):
+                path = os.path.join(directory, fileName(a, b))
+                if os.path.exists(path) and os.path.getsize(path) > HEADER.size:
+                    self.load(a, b, path)
+
+    def load(self, a, b, path):
+        file = open(path, "rb")
+        data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or len(data) != HEADER.size + 5 * count:
+            data.close()
+            file.close()
+            return
+        self.files[(a, b)] = file
+        self.maps[(a, b)] = data
+        view = memoryview(data)
+        indices = view[HEADER.size:HEADER.size + 4 * count].cast("I")
+        self.tables[(a, b)] = (indices, view[HEADER.size + 4 * count:])
+        self.maxMen = max(self.maxMen, a, b)
+
+    def __len__(self):
+        return len(self.maps)
+
+    def has(self, a, b):
+        return (a, b) in self.maps
+
+    # stored value of the position with mine to move, or None when its class is not available
+    def probe(self, mine, theirs):
+        table = self.tables.get((mine.bit_count(), theirs.bit_count()))
+        if table is None:
+            return None
+        indices, values = table
+        return values[bisect_left(indices, canonicalIndex(mine, theirs))]
+
+    def close(self):
+        for key in self.maps:
+            for view in self.tables[key]:
+                view.release()
+            self.maps[key].close()
+            self.files[key].close()
+        self.maps = {}
+        self.files = {}
+        self.tables = {}
@@ -0,0 +1,54 @@
+# search telemetry: what the search did for each move, written as one JSON line per move to stderr or
+# to a file (stdout is left to the referee protocol). turned on with TELEMETRY=stderr or TELEMETRY=<path>
+# in the environment of main(), or with wolflieu.setTelemetry(). when it is off the search only checks
+# that wolflieu.stats is None, at the few places that count something.
+import json
+import sys
+
+# cutoffs are counted by the index of the move that caused them, the last slot holds every later index
+CUTOFF_INDICES = 16
+
+
+# counters of the search of one move
+class SearchStats:
+    __slots__ = ("leaves", "tableProbes", "tableHits", "cutoffs", "frontierBatches", "iterations")
+
+    def __init__(self):
+        self.leaves = 0
+        self.tableProbes = 0
+        self.tableHits = 0
+        self.cutoffs = [0] * CUTOFF_INDICES
+        self.frontierBatches = 0
+        self.iterations = []
+
+    # a beta cutoff by the move at index in the ordered moves
+    def cutoff(self, index):
+        self.cutoffs[min(index, CUTOFF_INDICES - 1)] += 1
+
+    # a finished iteration of iterative deepening
+    def iteration(self, depth, score, seconds, nodes):
+        self.iterations.append({"depth": depth, "score": score, "seconds": round(seconds, 4), "nodes": nodes})
+
+    def toDict(self):
+        cutoffs = self.cutoffs[:]
+        while cutoffs and cutoffs[-1] == 0:
+            cutoffs.pop()
+        return {"leaves": self.leaves, "tableProbes": self.tableProbes, "tableHits": self.tableHits,
+                "cutoffs": cutoffs, "frontierBatches": self.frontierBatches, "iterations": self.iterations}
+
+
+# where the records go: "stderr" or the path of a file to append to
+class Telemetry:
+    def __init__(self, destination):
+        if destination == "stderr":
+            self.file = sys.stderr
+        else:
+            self.file = open(destination, "a")
+
+    def write(self, record):
+        self.file.write(json.dumps(record, separators = (",", ":")) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stderr:
+            self.file.close()
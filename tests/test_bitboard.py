@@ -0,0 +1,89 @@
+# regression tests of the bitboards (bitboard.py): make/unmake of Position, the terms Board keeps up to
+# date on every move, and isLegal against the move generator, on random games from the positions of perft.py:
+#   python -m pytest tests
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import perft
+from bitboard import Board, Position, encodeMove, decodeMove
+
+# random games played from each position, and their longest length in turns
+GAMES = 20
+PLIES = 80
+# turns between the positions isLegal is checked in
+CHECK_EVERY = 20
+
+
+# everything make/unmake keeps of a position
+def state(position):
+    return (position.pieces[:], position.hashes, position.men[:], position.centre[:], position.mobility[:],
+            position.mills[:], position.side, position.turn, position.lastChanged)
+
+# the incremental terms of board, and the same terms computed from scratch
+def terms(board):
+    fresh = Board(board.pieces[0], board.pieces[1])
+    return ((board.hashes, board.men, board.centre, board.mobility, board.mills),
+            (fresh.hashes, fresh.men, fresh.centre, fresh.mobility, fresh.mills))
+
+# a random game of at most PLIES turns from the list board at turn, as the Position it ended in
+def randomGame(rng, board, turn):
+    start = Board.fromList(board)
+    position = Position(start.pieces[0], start.pieces[1], 0, turn, 21)
+    for ply in range(PLIES):
+        if position.turn > 20 and position.men[position.side] < 3:
+            break
+        moves = position.generateMoves(position.side, position.turn)
+        if not moves:
+            break
+        position.make(rng.choice(moves))
+    return position
+
+# GAMES random games from each position of perft.py
+def randomGames(seed):
+    rng = random.Random(seed)
+    for name, board, turn in perft.POSITIONS:
+        for game in range(GAMES):
+            yield name, randomGame(rng, board, turn)
+
+
+class PositionTest(unittest.TestCase):
+    def testMoveEncoding(self):
+        for source in range(-1, 24):
+            for target in range(24):
+                for remove in (-1, 0, 23):
+                    self.assertEqual(decodeMove(encodeMove(source, target, remove)), (source, target, remove))
+
+    # the game is taken back move by move and played again, with every term right at every step
+    def testUnmakeAndMakeAgain(self):
+        for name, position in randomGames(1):
+            states = []
+            moves = []
+            while position.undo:
+                states.append(state(position))
+                moves.append(position.undo[-1][0])
+                position.unmake()
+                incremental, fresh = terms(position)
+                self.assertEqual(incremental, fresh, name)
+            for move in reversed(moves):
+                position.make(move)
+                self.assertEqual(state(position), states.pop(), name)
+                incremental, fresh = terms(position)
+                self.assertEqual(incremental, fresh, name)
+
+    def testIsLegalMatchesGenerator(self):
+        every = [encodeMove(source, target, remove) for source in range(-1, 24) for target in range(24) for remove in range(-1, 24)]
+        for name, position in randomGames(2):
+            # the positions of the game every CHECK_EVERY turns
+            while position.undo:
+                for ply in range(min(CHECK_EVERY, len(position.undo))):
+                    position.unmake()
+                side, turn = position.side, position.turn
+                legal = set(position.generateMoves(side, turn))
+                self.assertEqual(set(move for move in every if position.isLegal(side, turn, move)), legal, name)
+
+if __name__ == "__main__":
+    unittest.main()
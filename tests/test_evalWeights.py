@@ -0,0 +1,48 @@
+# tests of the weights file of the evaluation (evalWeights.py) and of how the engine loads it:
+#   python -m pytest tests
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRECTORY)
+
+from evalWeights import DEFAULT_WEIGHTS, loadWeights, writeWeights
+
+
+class WeightsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "weights.bin")
+
+    # the weights of the evaluation of wolflieu.py, imported in a new process with EVAL_WEIGHTS at path
+    def engineWeights(self):
+        code = "import wolflieu; print(wolflieu.PLACEMENT_MEN_WEIGHT, wolflieu.MEN_WEIGHT, wolflieu.CENTRE_WEIGHT, wolflieu.MOBILITY_WEIGHT)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output = True, text = True, cwd = DIRECTORY,
+                                env = dict(os.environ, EVAL_WEIGHTS = self.path))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return tuple(int(weight) for weight in result.stdout.split()), result.stderr
+
+    def testRoundTrip(self):
+        writeWeights(self.path, (90, 45, 12, 3))
+        self.assertEqual(loadWeights(self.path), (90, 45, 12, 3))
+        self.assertEqual(self.engineWeights()[0], (90, 45, 12, 3))
+
+    def testMissingFileGivesDefaults(self):
+        self.assertEqual(loadWeights(self.path), DEFAULT_WEIGHTS)
+
+    def testTruncatedFileGivesDefaults(self):
+        writeWeights(self.path, (90, 45, 12, 3))
+        with open(self.path, "r+b") as file:
+            file.truncate(10)
+        with self.assertRaises(ValueError):
+            loadWeights(self.path)
+        weights, errors = self.engineWeights()
+        self.assertEqual(weights, DEFAULT_WEIGHTS)
+        self.assertIn("default weights", errors)
+
+if __name__ == "__main__":
+    unittest.main()
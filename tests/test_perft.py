@@ -0,0 +1,31 @@
+# regression test of move generation: the counts of perft.py from its standard positions against the
+# counts of the list board functions in perft.REFERENCE, at depths that run in a few seconds:
+#   python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import perft
+
+# the deepest count checked from each position with the bitboard generator and with the list functions
+DEPTHS = {"start": 4, "placement": 4, "movement": 6, "flying": 4}
+LIST_DEPTHS = {"start": 3, "placement": 3, "movement": 4, "flying": 3}
+
+
+class PerftTest(unittest.TestCase):
+    def testBitboardGenerator(self):
+        for name, board, turn in perft.POSITIONS:
+            for depth in range(1, DEPTHS[name] + 1):
+                with self.subTest(position = name, depth = depth):
+                    self.assertEqual(perft.perft("bitboard", board, turn, depth), perft.REFERENCE[name][depth - 1])
+
+    def testListFunctions(self):
+        for name, board, turn in perft.POSITIONS:
+            for depth in range(1, LIST_DEPTHS[name] + 1):
+                with self.subTest(position = name, depth = depth):
+                    self.assertEqual(perft.perft("list", board, turn, depth), perft.REFERENCE[name][depth - 1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+# regression tests of the local referee (referee.py): reading the moves of the engines and playing
+# whole games by the rules of the engine:
+#   python -m pytest tests
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wolflieu
+from bitboard import Board, encodeMove, moveToBit
+from referee import FunctionEngine, moveText, parseMove, playGame
+
+GAMES = 10
+
+
+# an engine in the referee's process that keeps the moves of its opponent
+class RecordingEngine(FunctionEngine):
+    def start(self, isBlue):
+        FunctionEngine.start(self, isBlue)
+        self.received = []
+
+    def opponentMoved(self, text):
+        self.received.append(text)
+
+def randomEngine():
+    return RecordingEngine("random", lambda board, turn, lastChanged, isBlue: wolflieu.makeRandomMove(board, turn, isBlue))
+
+# replay the moves of a game and check every one of them, returns the Board and the turn after the last one
+def replay(test, moves):
+    board = Board()
+    turn = 1
+    for text in moves:
+        side = (turn - 1) % 2
+        move = parseMove(text, side, turn)
+        test.assertIsNotNone(move, text)
+        test.assertTrue(board.isLegal(side, turn, move), text)
+        test.assertEqual(moveText(move, side), text)
+        board.makeMove(side, move)
+        turn += 1
+    return board, turn
+
+
+class ParseMoveTest(unittest.TestCase):
+    def testPlacement(self):
+        self.assertEqual(parseMove("h1 a7 r0", 0, 1), encodeMove(-1, moveToBit("a7"), -1))
+        self.assertEqual(parseMove("h2 d6 g1", 1, 4), encodeMove(-1, moveToBit("d6"), moveToBit("g1")))
+        # the hand of the other player, or a man moved on the board before turn 21
+        self.assertIsNone(parseMove("h2 a7 r0", 0, 1))
+        self.assertIsNone(parseMove("h1 a7 r0", 1, 2))
+        self.assertIsNone(parseMove("a4 a7 r0", 0, 3))
+
+    def testMovement(self):
+        self.assertEqual(parseMove("a7 a4 r0", 0, 21), encodeMove(moveToBit("a7"), moveToBit("a4"), -1))
+        self.assertEqual(parseMove("g1 d1 b4", 1, 22), encodeMove(moveToBit("g1"), moveToBit("d1"), moveToBit("b4")))
+        self.assertIsNone(parseMove("h1 a7 r0", 0, 21))
+
+    def testNotAMove(self):
+        for text in ("", "h1", "h1 a7", "h1 a7 r0 r0", "h1 z9 r0", "h1 a7 a8", "h1 A7 r0", "h1 d4 r0"):
+            self.assertIsNone(parseMove(text, 0, 1), text)
+
+    def testSpacing(self):
+        self.assertEqual(parseMove("  a7\ta4   r0 ", 0, 21), parseMove("a7 a4 r0", 0, 21))
+
+    def testMoveTextRoundTrip(self):
+        rng = random.Random(1)
+        for game in range(GAMES):
+            board = Board()
+            for turn in range(1, 60):
+                side = (turn - 1) % 2
+                if turn > 20 and board.men[side] < 3:
+                    break
+                moves = board.generateMoves(side, turn)
+                if not moves:
+                    break
+                for move in moves:
+                    self.assertEqual(parseMove(moveText(move, side), side, turn), move)
+                board.makeMove(side, rng.choice(moves))
+
+
+class PlayGameTest(unittest.TestCase):
+    def testRandomGames(self):
+        for seed in range(GAMES):
+            blue, orange = randomEngine(), randomEngine()
+            game = playGame(blue, orange, openingPlies = 4, seed = seed)
+            board, turn = replay(self, game["moves"])
+            self.assertIn(game["result"], (-1, 0, 1))
+            # every move, the ones of the random opening as well, went to the other engine
+            self.assertEqual(orange.received, game["moves"][0::2])
+            self.assertEqual(blue.received, game["moves"][1::2])
+            if game["reason"] == "fewer than 3 men":
+                side = (turn - 1) % 2
+                self.assertLess(board.men[side], 3)
+                self.assertEqual(game["result"], -1 if side == 0 else 1)
+
+    def testIllegalMoveLoses(self):
+        # the point taken on the first move is taken again on the next
+        blue = RecordingEngine("a7", lambda board, turn, lastChanged, isBlue: "h1 a7 r0")
+        game = playGame(blue, randomEngine())
+        self.assertEqual((game["result"], game["reason"]), (-1, "illegal move h1 a7 r0"))
+        self.assertEqual(len(game["moves"]), 2)
+
+    # the other engine gets the move of an engine that spaces it oddly as the engine writes it
+    def testSpacingOfMovesIsNormalised(self):
+        blue = RecordingEngine("spaces", lambda board, turn, lastChanged, isBlue: "h1   a7\tr0" if turn == 1 else None)
+        orange = randomEngine()
+        game = playGame(blue, orange)
+        self.assertEqual(game["moves"][0], "h1 a7 r0")
+        self.assertEqual(orange.received[0], "h1 a7 r0")
+        self.assertEqual(game["reason"], "no answer")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# regression test of the search of wolflieu.py: with the transposition table, move ordering, principal
+# variation search and the batched frontier, search has to give the value of a plain negamax over every
+# move to the same depth:
+#   python -m pytest tests
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import perft
+import wolflieu
+from bitboard import Board, Position
+from ordering import MoveOrdering
+from tablebase import Tablebases
+
+# random positions searched from each position of perft.py, and the depth of the searches: DEPTH, or
+# SHALLOW_DEPTH when the player to move has more than BRANCHING moves (the placement phase and flying)
+POSITIONS = 6
+DEPTH = 4
+SHALLOW_DEPTH = 3
+BRANCHING = 12
+
+
+# the value of position for the player to move by plain negamax to depth, by the rules search plays by
+def negamax(position, depth):
+    side = position.side
+    turn = position.turn
+    if turn > 20 and position.men[side] < 3:
+        return -wolflieu.WIN_SCORE
+    if turn - position.lastChanged == 20:
+        return 0
+    if depth == 0:
+        score = wolflieu.evaluate(position, turn)
+        return score if side == 0 else -score
+    best = -wolflieu.WIN_SCORE
+    for move in position.generateMoves(side, turn):
+        position.make(move)
+        best = max(best, -negamax(position, depth - 1))
+        position.unmake()
+    return best
+
+# positions (as Position) of random games from the positions of perft.py, with either side to move
+def randomPositions(seed):
+    rng = random.Random(seed)
+    for name, board, turn in perft.POSITIONS:
+        for n in range(POSITIONS):
+            start = Board.fromList(board)
+            position = Position(start.pieces[0], start.pieces[1], 0, turn, 21)
+            for ply in range(rng.randint(0, 12)):
+                if position.turn > 20 and position.men[position.side] < 3:
+                    break
+                moves = position.generateMoves(position.side, position.turn)
+                if not moves:
+                    break
+                position.make(rng.choice(moves))
+            # a position without the moves that led to it
+            yield Position(position.pieces[0], position.pieces[1], position.side, position.turn, position.lastChanged)
+            # and after the placement phase the same men a few turns before the draw by the stalemate counter
+            if position.turn > 20:
+                yield Position(position.pieces[0], position.pieces[1], position.side, position.turn, position.turn - 17)
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        # no tablebases, as the negamax does not know them
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, value in (("tablebases", Tablebases(directory.name)), ("ordering", MoveOrdering()),
+                            ("deadline", float("inf")), ("stats", None)):
+            self.addCleanup(setattr, wolflieu, name, getattr(wolflieu, name))
+            setattr(wolflieu, name, value)
+
+    def testSearchIsNegamax(self):
+        for position in randomPositions(1):
+            # entries of deeper searches of other roots would give values deeper than the negamax
+            wolflieu.table.clear()
+            wolflieu.rootTurn = position.turn
+            moves = len(position.generateMoves(position.side, position.turn))
+            for depth in range(1, (DEPTH if moves <= BRANCHING else SHALLOW_DEPTH) + 1):
+                # the table keeps the entries of the shallower searches, like in iterative deepening
+                wolflieu.table.newSearch()
+                expected = negamax(position, depth)
+                self.assertEqual(wolflieu.search(position, depth, -wolflieu.INFINITY, wolflieu.INFINITY), expected,
+                                 (position.pieces, position.side, position.turn, depth))
+                self.assertEqual(position.undo, [])
+            # searched again, the values come from the table
+            wolflieu.table.newSearch()
+            self.assertEqual(wolflieu.search(position, depth, -wolflieu.INFINITY, wolflieu.INFINITY), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# tests of the games of server.py, played over a local port against an engine server with one worker:
+#   python -m pytest tests
+# the client plays blue, so it sends the first move, and the server checks every move of the client
+# before it plays it
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitboard import Board
+from gameRecord import readGames, textToMove
+from referee import parseMove
+from server import EngineServer
+
+# seconds per move of the server
+MOVE_TIME = 0.05
+
+
+class ServerGameTest(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.engine = EngineServer(1, 1, MOVE_TIME, os.path.join(cls.directory.name, "games.bin"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.close()
+        cls.directory.cleanup()
+
+    async def asyncSetUp(self):
+        self.server = await asyncio.start_server(self.engine.playGame, host = "127.0.0.1", port = 0)
+        self.reader, self.writer = await asyncio.open_connection(*self.server.sockets[0].getsockname()[:2])
+        # the server plays orange
+        await self.send("orange")
+        # the game as blue sees it
+        self.board = Board()
+        self.turn = 1
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def send(self, line):
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+
+    # play move for blue and return the answer of the server ("" when it closed the game)
+    async def play(self, move):
+        await self.send(move)
+        self.board.makeMove(0, parseMove(move, 0, self.turn))
+        self.turn += 1
+        answer = (await asyncio.wait_for(self.reader.readline(), 30)).decode().strip()
+        if answer:
+            packed = parseMove(answer, 1, self.turn)
+            self.assertIsNotNone(packed)
+            self.assertTrue(self.board.isLegal(1, self.turn, packed), answer)
+            self.board.makeMove(1, packed)
+            self.turn += 1
+        return answer
+
+    # the server plays on after a move with odd spacing, with the man where the move put it
+    async def testMoveWithExtraSpacesIsPlayed(self):
+        self.assertTrue(await self.play("h1  a7   r0"))
+        target = next(point for point in ("g1", "d1", "a1") if self.board.isLegal(0, self.turn, textToMove("h1 " + point + " r0")))
+        self.assertTrue(await self.play("h1 " + target + " r0"))
+
+    async def testWrongHandClosesGame(self):
+        await self.send("h2 a7 r0")
+        self.assertEqual(await asyncio.wait_for(self.reader.readline(), 30), b"")
+
+    async def testOccupiedPointClosesGame(self):
+        answer = await self.play("h1 a7 r0")
+        await self.send(answer.replace("h2", "h1"))
+        self.assertEqual(await asyncio.wait_for(self.reader.readline(), 30), b"")
+        # the game log has the moves up to the illegal one
+        self.writer.close()
+        await asyncio.sleep(0.1)
+        games = list(readGames(self.engine.log))
+        self.assertIn((False, [textToMove("h1 a7 r0"), textToMove(answer)]), [(blue, list(moves)) for blue, moves in games])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# regression tests of the 16 symmetries of the board (symmetry.py) and of the canonical keys they give
+# the transposition table, the opening book and the tablebases:
+#   python -m pytest tests
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitboard import ADJACENT, MILL_MASKS, Board, bitsOf
+from symmetry import INVERSE, PERMUTATIONS, canonical, transformBits, transformMove
+
+# random positions the keys are checked on
+POSITIONS = 300
+
+
+# random positions (mine, theirs, turn) of the placement and of the movement phase
+def randomPositions(seed):
+    rng = random.Random(seed)
+    for n in range(POSITIONS):
+        points = rng.sample(range(24), rng.randint(6, 18))
+        split = rng.randint(3, len(points) - 3)
+        yield sum(1 << p for p in points[:split]), sum(1 << p for p in points[split:]), rng.choice((9, 25))
+
+# the Board turned by symmetry s
+def transformed(board, s):
+    return Board(transformBits(board.pieces[0], s), transformBits(board.pieces[1], s))
+
+
+class SymmetryTest(unittest.TestCase):
+    def testGroup(self):
+        self.assertEqual(PERMUTATIONS[0], list(range(24)))
+        self.assertEqual(len(set(map(tuple, PERMUTATIONS))), 16)
+        permutations = set(map(tuple, PERMUTATIONS))
+        for s, permutation in enumerate(PERMUTATIONS):
+            self.assertEqual(sorted(permutation), list(range(24)))
+            self.assertEqual([PERMUTATIONS[INVERSE[s]][p] for p in permutation], list(range(24)))
+            for other in PERMUTATIONS:
+                self.assertIn(tuple(other[p] for p in permutation), permutations)
+
+    # a symmetry keeps the neighbours of every point and sends mills onto mills
+    def testGeometry(self):
+        for s in range(16):
+            for point in range(24):
+                self.assertEqual(transformBits(ADJACENT[point], s), ADJACENT[PERMUTATIONS[s][point]])
+            self.assertEqual(sorted(transformBits(mask, s) for mask in MILL_MASKS), MILL_MASKS)
+
+    def testTransformBits(self):
+        for mine, theirs, turn in randomPositions(1):
+            for s in range(16):
+                self.assertEqual(transformBits(mine, s), sum(1 << PERMUTATIONS[s][p] for p in bitsOf(mine)))
+                self.assertEqual(transformBits(transformBits(mine, s), INVERSE[s]), mine)
+
+    # the legal moves of a symmetric position are the legal moves turned the same way
+    def testMoves(self):
+        for mine, theirs, turn in randomPositions(2):
+            board = Board(mine, theirs)
+            moves = board.generateMoves(0, turn)
+            for s in range(16):
+                self.assertEqual(sorted(transformMove(move, s) for move in moves), sorted(transformed(board, s).generateMoves(0, turn)))
+
+    def testCanonical(self):
+        for mine, theirs, turn in randomPositions(3):
+            best = canonical(mine, theirs)
+            self.assertEqual((transformBits(mine, best[2]), transformBits(theirs, best[2])), best[:2])
+            for s in range(16):
+                self.assertEqual(canonical(transformBits(mine, s), transformBits(theirs, s))[:2], best[:2])
+
+    # symmetric positions share one key of the table, and a move stored in the frame of the canonical version
+    # comes back as the same move turned like the position
+    def testTableKeys(self):
+        for mine, theirs, turn in randomPositions(4):
+            board = Board(mine, theirs)
+            key, symmetry = board.canonicalHash()
+            moves = board.generateMoves(0, turn)
+            if not moves:
+                continue
+            stored = transformMove(moves[0], symmetry)
+            selfSymmetric = sum(transformed(board, s).pieces == board.pieces for s in range(16)) > 1
+            for s in range(16):
+                other = transformed(board, s)
+                otherKey, otherSymmetry = other.canonicalHash()
+                self.assertEqual(otherKey, key)
+                move = transformMove(stored, INVERSE[otherSymmetry])
+                self.assertTrue(other.isLegal(0, turn, move))
+                if not selfSymmetric:
+                    self.assertEqual(move, transformMove(moves[0], s))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# regression tests of the endgame tablebases (tablebase.py): numbering of the positions, the file format and
+# lookups through the canonical version of a position. when the 3 against 3 tablebase has been built
+# (python buildTablebase.py) every stored value is also checked against the values one move later:
+#   python -m pytest tests
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitboard import Board
+from symmetry import transformBits
+from tablebase import (HEADER, TABLEBASE_DIR, Tablebases, canonicalIndex, classSize, decodeValue, fileName,
+                       positionFromIndex, positionIndex, writeTablebase)
+
+# positions of the built 3 against 3 tablebase checked against their moves
+SAMPLE = 3000
+
+
+# random positions with a men against b men
+def randomPositions(rng, a, b, count):
+    for n in range(count):
+        points = rng.sample(range(24), a + b)
+        yield sum(1 << p for p in points[:a]), sum(1 << p for p in points[a:])
+
+# the stored value a position must have, from the values of the positions after its moves (values() of
+# the player to move then). a move that closes a mill leaves the other player with 2 men and wins at once
+def valueFromMoves(board, values):
+    wins = []
+    losses = []
+    draw = False
+    for move in board.generateMoves(0, 21):
+        if move >> 10:
+            wins.append(0)
+            continue
+        after = Board(board.pieces[0], board.pieces[1])
+        after.makeMove(0, move)
+        result, turns = decodeValue(values(after.pieces[1], after.pieces[0]))
+        if result == -1:
+            wins.append(turns)
+        elif result == 0:
+            draw = True
+        else:
+            losses.append(turns)
+    if wins:
+        return min(wins) + 2
+    if draw:
+        return 0
+    return max(losses, default = -1) + 2
+
+
+class TablebaseTest(unittest.TestCase):
+    def testPositionIndex(self):
+        rng = random.Random(1)
+        for a, b in ((3, 3), (3, 5), (4, 3), (6, 6)):
+            for mine, theirs in randomPositions(rng, a, b, 500):
+                index = positionIndex(mine, theirs)
+                self.assertLess(index, classSize(a, b))
+                self.assertEqual(positionFromIndex(index, a, b), (mine, theirs))
+
+    # a file written with writeTablebase answers for every symmetric version of its positions
+    def testProbeThroughSymmetries(self):
+        rng = random.Random(2)
+        values = {}
+        for mine, theirs in randomPositions(rng, 3, 4, 200):
+            values[canonicalIndex(mine, theirs)] = rng.randint(0, 40)
+        indices = sorted(values)
+        with tempfile.TemporaryDirectory() as directory:
+            writeTablebase(os.path.join(directory, fileName(3, 4)), indices, bytes(values[index] for index in indices))
+            # a file that is not a tablebase is left out
+            with open(os.path.join(directory, fileName(4, 3)), "wb") as file:
+                file.write(HEADER.pack(b"XXXX", 1, 1) + bytes(5))
+            tablebases = Tablebases(directory)
+            try:
+                self.assertTrue(tablebases.has(3, 4))
+                self.assertFalse(tablebases.has(4, 3))
+                self.assertEqual(len(tablebases), 1)
+                self.assertIsNone(tablebases.probe(0b111, 0b111000))
+                for index in indices:
+                    mine, theirs = positionFromIndex(index, 3, 4)
+                    for s in range(16):
+                        self.assertEqual(tablebases.probe(transformBits(mine, s), transformBits(theirs, s)), values[index])
+            finally:
+                tablebases.close()
+
+    def testDecodeValue(self):
+        self.assertEqual(decodeValue(0), (0, 0))
+        self.assertEqual(decodeValue(1), (-1, 0))
+        self.assertEqual(decodeValue(2), (1, 1))
+        self.assertEqual(decodeValue(4), (1, 3))
+        self.assertEqual(decodeValue(5), (-1, 4))
+
+    @unittest.skipUnless(os.path.exists(os.path.join(TABLEBASE_DIR, fileName(3, 3))), "the 3 against 3 tablebase is not built")
+    def testValuesAgreeWithMoves(self):
+        tablebases = Tablebases(TABLEBASE_DIR)
+        try:
+            indices = tablebases.tables[(3, 3)][0]
+            for index in random.Random(3).sample(range(len(indices)), min(SAMPLE, len(indices))):
+                mine, theirs = positionFromIndex(indices[index], 3, 3)
+                self.assertEqual(tablebases.probe(mine, theirs), valueFromMoves(Board(mine, theirs), tablebases.probe), (mine, theirs))
+        finally:
+            tablebases.close()
+
+if __name__ == "__main__":
+    unittest.main()
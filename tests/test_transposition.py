@@ -0,0 +1,77 @@
+# regression tests of the transposition table (transposition.py): what probe returns for what was stored,
+# the two-tier replacement in a bucket, and a table shared through one buffer:
+#   python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitboard import encodeMove
+from transposition import EXACT, LOWER, UPPER, TranspositionTable, tableBytes
+
+KEY = 0x9E3779B97F4A7C15
+
+
+class TranspositionTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(1)
+        # another key of the bucket of KEY
+        self.other = KEY + self.table.buckets
+        self.third = KEY + 2 * self.table.buckets
+
+    def testStoreAndProbe(self):
+        move = encodeMove(3, 4, 23)
+        for depth, bound, score in ((0, EXACT, 0), (7, LOWER, -9999), (127, UPPER, 20000), (5, EXACT, -20000)):
+            self.table.store(KEY, depth, bound, score, move)
+            self.assertEqual(self.table.probe(KEY), (depth, bound, score, move))
+        # deeper searches are stored as 127
+        self.table.store(KEY, 300, EXACT, 1, move)
+        self.assertEqual(self.table.probe(KEY)[0], 127)
+        self.assertIsNone(self.table.probe(KEY ^ 1))
+        self.assertIsNone(self.table.probe(self.other))
+
+    def testTwoTierReplacement(self):
+        self.table.store(KEY, 8, EXACT, 10, 1)
+        # a shallower entry of another position goes to the second slot, and the deep one stays
+        self.table.store(self.other, 2, EXACT, 20, 2)
+        self.assertEqual(self.table.probe(KEY), (8, EXACT, 10, 1))
+        self.assertEqual(self.table.probe(self.other), (2, EXACT, 20, 2))
+        # the second slot is always replaced
+        self.table.store(self.third, 3, EXACT, 30, 3)
+        self.assertEqual(self.table.probe(KEY), (8, EXACT, 10, 1))
+        self.assertIsNone(self.table.probe(self.other))
+        self.assertEqual(self.table.probe(self.third), (3, EXACT, 30, 3))
+        # the same position replaces its deep entry whatever the depth
+        self.table.store(KEY, 1, LOWER, 11, 4)
+        self.assertEqual(self.table.probe(KEY), (1, LOWER, 11, 4))
+
+    def testOlderSearchIsReplaced(self):
+        self.table.store(KEY, 8, EXACT, 10, 1)
+        self.table.newSearch()
+        self.table.store(self.other, 2, EXACT, 20, 2)
+        self.assertIsNone(self.table.probe(KEY))
+        self.assertEqual(self.table.probe(self.other), (2, EXACT, 20, 2))
+
+    def testClear(self):
+        self.table.store(KEY, 8, EXACT, 10, 1)
+        self.table.newSearch()
+        self.table.clear()
+        self.assertIsNone(self.table.probe(KEY))
+        self.assertEqual(self.table.age, 0)
+
+    def testSharedBuffer(self):
+        buffer = bytearray(tableBytes(1))
+        first = TranspositionTable(1, buffer)
+        second = TranspositionTable(1, buffer)
+        first.store(KEY, 6, UPPER, -5, 7)
+        self.assertEqual(second.probe(KEY), (6, UPPER, -5, 7))
+        # an entry whose key word and data word do not belong together (half written) matches no key
+        slot = (KEY % first.buckets) * 2
+        first.data[slot] ^= 1 << 20
+        self.assertIsNone(second.probe(KEY))
+        first.release()
+        second.release()
+
+if __name__ == "__main__":
+    unittest.main()
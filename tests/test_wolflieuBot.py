@@ -0,0 +1,158 @@
+# tests of the model side of wolflieuBot.py against a local stub of the model's HTTP API (LLM_BASE_URL):
+#   python -m pytest tests
+#   python -m unittest discover tests
+# the stub answers every request with the text and after the delay the test sets, and counts the requests.
+# the opening book is off so the search decides every move, and the cache of model moves is a temporary file
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wolflieu
+import wolflieuBot
+from bitboard import Board
+from ordering import MoveOrdering
+
+try:
+    from google import genai
+except ImportError:
+    genai = None
+
+EMPTY = [[0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0, 0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0]]
+# seconds per move, enough for the search, the model and the check of its move
+MOVE_TIME = 1.5
+
+
+# the model: every request gets answer after delay seconds
+class StubModel(BaseHTTPRequestHandler):
+    answer = ""
+    delay = 0.0
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        StubModel.requests += 1
+        time.sleep(StubModel.delay)
+        body = json.dumps({"candidates": [{"content": {"role": "model", "parts": [{"text": StubModel.answer}]}}]}).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            # the bot stopped waiting for a late answer
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipIf(genai is None, "google-genai is not installed")
+class ModelMoveTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubModel)
+        threading.Thread(target = cls.server.serve_forever, daemon = True).start()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.book = wolflieu.openingBook
+        wolflieu.openingBook = None
+        # what loadSettings() would read from LLM_BASE_URL and API_KEY
+        wolflieuBot.baseUrl = "http://127.0.0.1:" + str(cls.server.server_address[1])
+        wolflieuBot.api_key = "test"
+        wolflieuBot.settingsLoaded = True
+        wolflieuBot.startWarmUp()
+        wolflieuBot.warmUpThread.join()
+
+    @classmethod
+    def tearDownClass(cls):
+        wolflieuBot.closeCache()
+        wolflieu.openingBook = cls.book
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        wolflieuBot.closeCache()
+        wolflieuBot.CACHE_FILE = os.path.join(self.directory.name, self.id() + ".sqlite")
+        wolflieu.table.clear()
+        # no killers or history of the searches of the tests before
+        self.addCleanup(setattr, wolflieu, "ordering", wolflieu.ordering)
+        wolflieu.ordering = MoveOrdering()
+        StubModel.requests = 0
+        StubModel.delay = 0.0
+        # the moves of the search, to compare the move played with
+        self.searched = []
+        searchMove = wolflieu.searchMove
+
+        def recordSearch(*args):
+            result = searchMove(*args)
+            self.searched.append(wolflieu.moveToText(result[0], True))
+            return result
+
+        wolflieu.searchMove = recordSearch
+        self.addCleanup(setattr, wolflieu, "searchMove", searchMove)
+
+    def play(self, board, turn):
+        return wolflieuBot.makeMove([row[:] for row in board], turn, 21, True, MOVE_TIME)
+
+    # the search accepts any move of the model short of a known loss: which placements on the empty board
+    # score within MODEL_MARGIN of the best one depends on the depth the search reaches in its time
+    def acceptAnyMove(self):
+        self.addCleanup(setattr, wolflieuBot, "MODEL_MARGIN", wolflieuBot.MODEL_MARGIN)
+        wolflieuBot.MODEL_MARGIN = wolflieu.KNOWN_WIN
+
+    def testLegalModelMoveIsPlayed(self):
+        self.acceptAnyMove()
+        StubModel.answer = "I would play h1 g1 r0."
+        self.assertEqual(self.play(EMPTY, 1), "h1 g1 r0")
+        self.assertNotEqual(self.searched[-1], "h1 g1 r0")
+        self.assertEqual(StubModel.requests, 1)
+
+    def testIllegalAnswerFallsBackToSearch(self):
+        # orange's hand is not blue's
+        StubModel.answer = "h2 g1 r0"
+        move = self.play(EMPTY, 1)
+        self.assertEqual(move, self.searched[-1])
+        self.assertIn(move, [wolflieu.moveToText(legal, True) for legal in Board().generateMoves(0, 1)])
+
+    def testLateAnswerFallsBackToSearch(self):
+        StubModel.answer = "h1 g1 r0"
+        StubModel.delay = MOVE_TIME + 1.0
+        start = time.time()
+        move = self.play(EMPTY, 1)
+        self.assertLess(time.time() - start, MOVE_TIME)
+        self.assertEqual(move, self.searched[-1])
+
+    def testRepeatedPositionIsCacheHit(self):
+        self.acceptAnyMove()
+        StubModel.answer = "h1 g1 r0"
+        self.assertEqual(self.play(EMPTY, 1), "h1 g1 r0")
+        self.assertEqual(self.play(EMPTY, 1), "h1 g1 r0")
+        self.assertEqual(StubModel.requests, 1)
+        self.assertEqual(wolflieuBot.cache.counters["hits"], 1)
+
+    # a cached move the search rejects is replaced by the move of the search, so it is checked only once
+    def testRejectedCachedMoveIsReplaced(self):
+        # blue closes a mill on g7, orange would close one on g1
+        board = [[1, 1, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0, 0, 0, 0], [0, 0, 0], [0, 0, 0], [-1, -1, 0]]
+        position = Board.fromList(board)
+        StubModel.answer = "h1 b6 r0"
+        self.assertNotEqual(self.play(board, 5), "h1 b6 r0")
+        self.assertEqual(self.play(board, 5), self.searched[-1])
+        self.assertEqual(len(self.searched), 3)
+        best = wolflieuBot.cache.lookup(position.pieces[0], position.pieces[1], 5, True)
+        self.assertEqual(wolflieu.moveToText(best, True), self.searched[-1])
+        self.play(board, 5)
+        # the short search agreed with the cache and no search followed
+        self.assertEqual(len(self.searched), 4)
+        self.assertEqual(StubModel.requests, 1)
+
+if __name__ == "__main__":
+    unittest.main()
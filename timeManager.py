@@ -0,0 +1,43 @@
+# time management of both bots (wolflieu.py and wolflieuBot.py). the referee gives every move MOVE_LIMIT
+# seconds, counted from when it asks for the move. a move gets two budgets, in seconds from that moment:
+#   hard   the search stops at once, even in the middle of an iteration, and plays the best move found
+#          so far. it is the limit less a safety margin for printing the move and for clocks that differ
+#   soft   no new iteration of iterative deepening starts after it, since it would most likely not
+#          finish before the hard budget. an iteration costs about the square root of the number of
+#          moves (the branching factor of alpha-beta) times all the iterations before it, so positions
+#          with more moves stop sooner. the phase of the game scales it as well
+import math
+import os
+
+# seconds the referee gives each move (MOVE_LIMIT in the environment changes it), and the part of it
+# the search leaves unused
+MOVE_LIMIT = float(os.getenv("MOVE_LIMIT", "4.0"))
+SAFETY_MARGIN = 0.3
+
+# how much of its share of the time each phase of the game gets: the movement phase decides most games
+# and its narrow trees get much deeper with more time, the wide trees of the flying phase do not
+PHASE_WEIGHT = {"placement": 1.0, "movement": 1.2, "flying": 0.8}
+# the soft budget is never more than this part of the hard budget
+MAX_SOFT_SHARE = 0.75
+
+# the phase of the game for the player to move with men men on the board at turn
+def phase(turn, men):
+    if turn <= 20:
+        return "placement"
+    if men == 3:
+        return "flying"
+    return "movement"
+
+
+class TimeManager:
+    def __init__(self, moveLimit = MOVE_LIMIT, safety = SAFETY_MARGIN):
+        self.moveLimit = moveLimit
+        self.safety = safety
+
+    # the soft and hard budgets of a move at turn, with men men of the player to move on the board
+    # and branching legal moves
+    def budgets(self, turn, men, branching):
+        hard = max(self.moveLimit - self.safety, 0.0)
+        growth = max(2.0, math.sqrt(branching))
+        soft = min(hard / growth * PHASE_WEIGHT[phase(turn, men)], hard * MAX_SOFT_SHARE)
+        return soft, hard
@@ -0,0 +1,96 @@
+# fixed size transposition table for the minimax search.
+# every entry takes two 64 bit words: the Zobrist key of the position and a packed data word
+#   bits 0-14   best move (packed like bitboard.encodeMove, 0 is no move)
+#   bits 15-30  score + 32768
+#   bits 31-37  depth searched
+#   bits 38-39  bound type (EXACT, LOWER, UPPER)
+#   bits 40-47  age, the search that stored the entry
+# entries go in buckets of two (two-tier replacement): the first slot keeps the deepest entry
+# of the current search, the second slot is always replaced.
+# the key word holds key ^ data, so an entry half written by another process (when the table
+# lives in shared memory for the parallel search) does not match any key and is ignored.
+import mmap
+import sys
+
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+ENTRY_BYTES = 16
+
+# number of bytes a table of sizeMB takes, to allocate shared memory for it
+def tableBytes(sizeMB):
+    return max(1, sizeMB * 1024 * 1024 // (2 * ENTRY_BYTES)) * 2 * ENTRY_BYTES
+
+# attach to the shared memory block name (see multiprocessing.shared_memory) that another process made
+# for its table. that process unlinks the block, so this one keeps it away from the resource tracker,
+# which would otherwise unlink it under the owner or warn about a leak when this process is stopped
+def attachMemory(name):
+    from multiprocessing import shared_memory, resource_tracker
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name = name, track = False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name = name)
+    finally:
+        resource_tracker.register = register
+
+
+class TranspositionTable:
+    # buffer: optional writable buffer of tableBytes(sizeMB) bytes (e.g. SharedMemory.buf) to keep the entries in
+    def __init__(self, sizeMB = 16, buffer = None):
+        self.buckets = max(1, sizeMB * 1024 * 1024 // (2 * ENTRY_BYTES))
+        if buffer is None:
+            # anonymous memory starts out zero and only takes pages as entries are written,
+            # so making a big table costs nothing at startup
+            buffer = mmap.mmap(-1, tableBytes(sizeMB))
+        self.buffer = buffer
+        self.words = memoryview(buffer)[:tableBytes(sizeMB)].cast("Q")
+        self.keys = self.words[:2 * self.buckets]
+        self.data = self.words[2 * self.buckets:]
+        self.age = 0
+
+    def sizeMB(self):
+        return self.buckets * 2 * ENTRY_BYTES / (1024 * 1024)
+
+    # forget everything
+    def clear(self):
+        size = self.buckets * 2 * ENTRY_BYTES
+        self.buffer[:size] = bytes(size)
+        self.age = 0
+
+    # stop using the buffer so it can be closed
+    def release(self):
+        self.keys.release()
+        self.data.release()
+        self.words.release()
+
+    # called once per search so entries of older searches get replaced first
+    def newSearch(self):
+        self.age = (self.age + 1) & 255
+
+    # return (depth, bound, score, move) stored for key, or None
+    def probe(self, key):
+        slot = (key % self.buckets) * 2
+        data = self.data[slot]
+        if self.keys[slot] ^ data != key:
+            slot += 1
+            data = self.data[slot]
+            if self.keys[slot] ^ data != key:
+                return None
+        if data == 0:
+            return None
+        return ((data >> 31) & 127, (data >> 38) & 3, ((data >> 15) & 65535) - 32768, data & 32767)
+
+    def store(self, key, depth, bound, score, move):
+        slot = (key % self.buckets) * 2
+        data = move | ((score + 32768) << 15) | (min(depth, 127) << 31) | (bound << 38) | (self.age << 40)
+        old = self.data[slot]
+        # keep the deep slot unless the new entry is at least as deep, is the same position or the old one is stale
+        if old == 0 or self.keys[slot] ^ old == key or depth >= (old >> 31) & 127 or (old >> 40) & 255 != self.age:
+            self.keys[slot] = key ^ data
+            self.data[slot] = data
+        else:
+            self.keys[slot + 1] = key ^ data
+            self.data[slot + 1] = data
@@ -0,0 +1,158 @@
+# tuning of the weights of evaluate (see evalWeights.py) from the games in game logs (see gameRecord.py),
+# Texel style: the evaluation of a position, squashed by sigmoid(K * evaluation), should predict the result
+# of the game it was played in (1 when blue won, 0.5 for a draw, 0 when blue lost):
+#   python referee.py wolflieu wolflieu --games 20000 --workers 8 --log selfplay.bin
+#   python tuneWeights.py selfplay.bin games.bin --epochs 20
+# every position after a move of a finished game is replayed, and the quiet ones (the next move removes
+# no man, so the material is about to stay as it is) become one row of the feature matrix:
+#   placement men, men, centre, mobility   differences blue minus orange (see frontier.positionTerms),
+#                                          men in the placement phase and the rest after it
+# K is fitted first so the current weights predict the results as well as they can, which keeps the
+# tuned weights in the units of the search. then the mean squared error of the prediction is brought
+# down by gradient descent (Adam) over shuffled mini-batches of the matrix, all of it in NumPy.
+# the weights are rounded to ints and written to the weights file the engine loads when it starts.
+import argparse
+import sys
+import time
+
+import numpy
+
+import frontier
+from bitboard import Board
+from gameRecord import readGames
+from evalWeights import WEIGHTS_FILE, NAMES, loadWeights, writeWeights
+
+# no weight goes above this, so that no evaluation gets near the scores of known results
+# (9 men, 9 of them on a middle position and 36 moves at most)
+MAX_WEIGHT = 150
+# positions whose features are computed in one go
+CHUNK = 1 << 16
+
+
+# the result of the game moves for blue (1, 0.5 or 0) with the rules of the referee,
+# or None when the log stops before the game is over (a crash or a lost connection)
+def gameResult(board, turn, lastChanged):
+    side = (turn - 1) % 2
+    if turn > 20 and board.men[side] < 3:
+        loser = side
+    elif turn - lastChanged == 20:
+        return 0.5
+    elif not board.generateMoves(side, turn):
+        loser = side
+    else:
+        return None
+    return 0.0 if loser == 0 else 1.0
+
+# the quiet positions of the games of the logs at paths as arrays of the men of blue, the men of
+# orange, the turn and the result of the game for blue
+def readPositions(paths):
+    blue = []
+    orange = []
+    turns = []
+    results = []
+    games = 0
+    for path in paths:
+        for botBlue, moves in readGames(path):
+            board = Board()
+            lastChanged = 21
+            positions = []
+            for turn, move in enumerate(moves, 1):
+                side = (turn - 1) % 2
+                board.makeMove(side, move)
+                if turn > 20 and move >> 10:
+                    lastChanged = turn
+                # the position after the move is quiet when the move after it removes no man
+                if turn < len(moves) and not moves[turn] >> 10:
+                    positions.append((board.pieces[0], board.pieces[1], turn + 1))
+            result = gameResult(board, len(moves) + 1, lastChanged)
+            if result is None:
+                continue
+            games += 1
+            for mine, theirs, turn in positions:
+                blue.append(mine)
+                orange.append(theirs)
+                turns.append(turn)
+                results.append(result)
+    return numpy.array(blue, dtype = numpy.int64), numpy.array(orange, dtype = numpy.int64), numpy.array(turns), numpy.array(results), games
+
+# the feature matrix (one row per position, one column per weight in the order of evalWeights.NAMES)
+def features(blue, orange, turns):
+    matrix = numpy.zeros((len(blue), len(NAMES)))
+    for start in range(0, len(blue), CHUNK):
+        end = start + CHUNK
+        men, centre, mobility = frontier.positionTerms(blue[start:end], orange[start:end])
+        placement = turns[start:end] <= 20
+        matrix[start:end, 0] = numpy.where(placement, men, 0)
+        matrix[start:end, 1] = numpy.where(placement, 0, men)
+        matrix[start:end, 2] = numpy.where(placement, 0, centre)
+        matrix[start:end, 3] = numpy.where(placement, 0, mobility)
+    return matrix
+
+def sigmoid(values):
+    return 1 / (1 + numpy.exp(-values))
+
+# mean squared error of the predictions of weights with scale K
+def loss(matrix, results, weights, K):
+    return float(numpy.mean((results - sigmoid(K * (matrix @ weights))) ** 2))
+
+# the K between 1e-4 and 1 (on a log scale) with the smallest loss of weights
+def fitScale(matrix, results, weights):
+    evaluations = matrix @ weights
+    scales = numpy.geomspace(1e-4, 1, 200)
+    errors = [numpy.mean((results - sigmoid(K * evaluations)) ** 2) for K in scales]
+    return float(scales[int(numpy.argmin(errors))])
+
+# gradient descent with Adam over shuffled mini-batches of batch rows, starting from weights.
+# rate is the step in units of the weights
+def fit(matrix, results, weights, K, epochs, batch, rate, seed):
+    rng = numpy.random.default_rng(seed)
+    weights = weights.astype(float)
+    moment = numpy.zeros_like(weights)
+    square = numpy.zeros_like(weights)
+    beta1, beta2 = 0.9, 0.999
+    step = 0
+    for epoch in range(epochs):
+        order = rng.permutation(len(matrix))
+        for start in range(0, len(order), batch):
+            rows = order[start:start + batch]
+            x = matrix[rows]
+            predicted = sigmoid(K * (x @ weights))
+            # derivative of the mean of (result - predicted)^2 by the weights
+            gradient = (2 * K) * ((predicted - results[rows]) * predicted * (1 - predicted)) @ x / len(rows)
+            step += 1
+            moment = beta1 * moment + (1 - beta1) * gradient
+            square = beta2 * square + (1 - beta2) * gradient ** 2
+            weights -= rate * (moment / (1 - beta1 ** step)) / (numpy.sqrt(square / (1 - beta2 ** step)) + 1e-12)
+            numpy.clip(weights, 0, MAX_WEIGHT, out = weights)
+        print("epoch", epoch + 1, "loss %.6f" % loss(matrix, results, weights, K), "weights", numpy.round(weights, 2).tolist(), flush = True)
+    return weights
+
+def main():
+    parser = argparse.ArgumentParser(description = "tune the weights of the evaluation on logged games")
+    parser.add_argument("logs", nargs = "+", help = "game logs written by the bots or by referee.py --log")
+    parser.add_argument("--epochs", type = int, default = 10)
+    parser.add_argument("--batch", type = int, default = 4096, help = "positions per mini-batch")
+    parser.add_argument("--rate", type = float, default = 0.5, help = "step of Adam, in units of the weights")
+    parser.add_argument("--seed", type = int, default = 4341)
+    parser.add_argument("--output", default = WEIGHTS_FILE)
+    args = parser.parse_args()
+
+    start = time.time()
+    blue, orange, turns, results, games = readPositions(args.logs)
+    if games == 0:
+        sys.exit("no finished games in " + ", ".join(args.logs))
+    matrix = features(blue, orange, turns)
+    print(games, "games,", len(matrix), "positions in", round(time.time() - start, 1), "s", flush = True)
+
+    weights = numpy.array(loadWeights(args.output), dtype = float)
+    K = fitScale(matrix, results, weights)
+    print("K %.6f," % K, "loss of the current weights %.6f" % loss(matrix, results, weights, K), flush = True)
+    weights = fit(matrix, results, weights, K, args.epochs, args.batch, args.rate, args.seed)
+    tuned = [int(round(weight)) for weight in weights]
+    print("tuned weights:", ", ".join(name + " " + str(weight) for name, weight in zip(NAMES, tuned)))
+    print("loss of the tuned weights %.6f" % loss(matrix, results, numpy.array(tuned, dtype = float), K))
+    writeWeights(args.output, tuned)
+    print("written to", args.output, "in", round(time.time() - start, 1), "s")
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,124 @@
+import time
+# the clock of the referee starts before the imports below are done, the first move counts from here
+STARTED = time.time()
+
 import sys
+import os
 import random
+import atexit
+import queue
+import threading
+from geometry import ROW_START, NAMES, POINT_OF_NAME, POINTS, NEIGHBOUR_INDEX, MILL_INDEX
+from bitboard import Board, Position, NO_MOVE, bitToMove, decodeMove
+from zobrist import stateKey
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, tableBytes, attachMemory
+from ordering import MoveOrdering
+from symmetry import transformMove, INVERSE
+from book import OpeningBook, BOOK_FILE
+from tablebase import Tablebases, TABLEBASE_DIR, decodeValue
+from frontier import AVAILABLE as FRONTIER_AVAILABLE, childTerms
+from telemetry import SearchStats, Telemetry
+from timeManager import TimeManager
+from gameRecord import GAME_LOG, textToMove, appendGame
+from evalWeights import WEIGHTS_FILE, DEFAULT_WEIGHTS, loadWeights
+
+WIN_SCORE = 10000
+INFINITY = 20000
+# scores at least this far from 0 are known results (wins from the tablebases are WIN_SCORE - turns to win)
+KNOWN_WIN = WIN_SCORE - 256
+
+# weights of evaluate: men in the placement phase, men after it, men on a middle position and mobility
+# (tuned by tuneWeights.py when weights.bin exists, see evalWeights.py). a broken weights file is
+# played without, like a missing one
+try:
+    weights = loadWeights(WEIGHTS_FILE)
+except (OSError, ValueError) as error:
+    print("using the default weights:", error, file = sys.stderr)
+    weights = DEFAULT_WEIGHTS
+PLACEMENT_MEN_WEIGHT, MEN_WEIGHT, CENTRE_WEIGHT, MOBILITY_WEIGHT = weights
+
+# size of the transposition table in MB, kept between the moves of a game
+TABLE_SIZE_MB = 16
+table = TranspositionTable(TABLE_SIZE_MB)
+
+# change the size of the transposition table (this empties it)
+def setTableSize(sizeMB):
+    global table, TABLE_SIZE_MB
+    if helpers:
+        setWorkers(WORKERS, sizeMB)
+    else:
+        TABLE_SIZE_MB = sizeMB
+        table = TranspositionTable(sizeMB)
+
+# the deepest depth makeMove tries, and the half width of the aspiration window around the previous score
+MAX_DEPTH = 64
+ASPIRATION_WINDOW = 30
+# nodes with depth 1 and at least this many moves evaluate their children in one batch (see frontier.py),
+# smaller ones are cheaper one child at a time
+FRONTIER_BATCH = 12 if FRONTIER_AVAILABLE else INFINITY
+
+# the budgets of the time of each move of makeMove (see timeManager.py)
+clock = TimeManager()
+
+# raised inside the search when the deadline is reached
+class SearchTimeout(Exception):
+    pass
+
+# time.time() at which the running search has to stop, the nodes it has visited,
+# and the turn it started from (ply = turn - rootTurn)
+deadline = float("inf")
+nodes = 0
+rootTurn = 0
+# the search also stops after this many nodes (analyze.py searches with a fixed number of nodes)
+nodeLimit = float("inf")
+
+# the best move of the last search of the root, and the best root move of the unfinished iteration
+# and its score, when a move scored above the bottom of the window (so better than the moves before it
+# at the same depth), otherwise None
+rootMove = NO_MOVE
+rootPartial = None
+
+# killer moves and history table used to order the moves
+ordering = MoveOrdering()
+
+# opening book of the placement phase (None when book.bin has not been built, see buildBook.py)
+openingBook = OpeningBook.open(BOOK_FILE)
+
+# endgame tablebases (none when they have not been built, see buildTablebase.py)
+tablebases = Tablebases(TABLEBASE_DIR)
+
+# parallel search (Lazy SMP): number of processes searching each move (see setWorkers),
+# the helper processes with their task queues, the shared memory holding the transposition table,
+# the queue the helpers report finished depths to, the event that stops them, and the number of the current search
+WORKERS = 1
+helpers = []
+sharedMemory = None
+results = None
+stopEvent = None
+searchNumber = 0
+
+# pondering: the thread searching while the opponent thinks, and the event that stops it
+ponderThread = None
+ponderStop = None
+
+# telemetry (see telemetry.py): where the records go, and the counters of the running search,
+# both None when telemetry is off
+telemetry = None
+stats = None
+
+# check if the running search has to stop
+def timeUp():
+    return time.time() > deadline or nodes > nodeLimit or (stopEvent is not None and stopEvent.is_set()) or (ponderStop is not None and ponderStop.is_set())
 
 #convert the text to move in array
 def moveToIndex(str):
-    if (str == "h1" or str == "r0"):
+    if (str not in POINT_OF_NAME):
         return [-1, -1]
-    col = ord(str[0]) - 97
-    row = 7 - int(str[1])
-    if (row != 3):
-        if (col < 3):
-            col = 0
-        elif (col > 3):
-            col = 2
-        else:
-            col = 1
-    else:
-        if col > 3:
-            col -= 1
-    return [row, col]
+    return POINTS[POINT_OF_NAME[str]]
 
 # convert the move from number in array into text
 def indexToMove(row, col):
-    if (row == 3):
-        if (col < 3):
-            return chr(col + 97) + "4"
-        else:
-            return chr(col + 97 + 1) + "4"
-    if (col == 1):
-        return "d" + str(7 - row)
-    if (col < 1):
-        return chr(100 - abs(3 - row)) + str(7 - row)
-    else:
-        return chr(100 + abs(3 - row)) + str(7 - row)
+    return NAMES[ROW_START[row] + col]
 
 # for debugging purpose, print out the board
 def printBoard(board):
@@ -65,42 +152,9 @@ def changeBoardWithIndex(board, row, col, type):
 
 # Check for mill based on the row and column used
 def checkForMill(board, row, col, type):
-    if (row != 3):
-        for i in range(3):
-            if (board[row][i] != type):
-                break
-            if (i == 2):
-                return True
-        if col == 0:
-            if (board[6-row][col] == type and board[3][3 - abs(3-row)] == type):
-                return True
-        elif col == 2:
-            if (board[6-row][col] == type and board[3][2 + abs(3-row)] == type):
-                return True
-        else:
-            if row < 3:
-                if (board[0][1] == type and board[1][1] == type and board[2][1] == type):
-                    return True
-            else:
-                if (board[4][1] == type and board[5][1] == type and board[6][1] == type):
-                    return True
-    else:
-        if col < 3:
-            for i in range(3):
-                if (board[3][i] != type):
-                    break
-                if (i == 2):
-                    return True
-            if (board[col][0] == type and board[6 - col][0] == type):
-                return True
-        else:
-            for i in range(3):
-                if (board[3][i + 3] != type):
-                    break
-                if (i == 2):
-                    return True
-            if (board[col + 1][2] == type and board[6 - col - 1][2] == type):
-                return True
+    for mill in MILL_INDEX[row][col]:
+        if (board[mill[0][0]][mill[0][1]] == type and board[mill[1][0]][mill[1][1]] == type):
+            return True
     return False
 
 # if the remaining pieces on the board is 2 (assuming the turn is in phase 2)
@@ -112,9 +166,9 @@ def checkWinByNumber(board, type):
             if (board[i][j] == type):
                 count += 1
     for i in range (3):
-        if (board[3][i] == type):
+        if (board[3][i + 3] == type):
             count += 1
-    if type == 2:
+    if count == 2:
         return True
     return False
 
@@ -132,307 +186,475 @@ def checkSpacesState(board, type):
 
 # check for opponent pieces that is not in mill. If all pieces are in a mill, return all opponents pieces
 def checkRemovableSpaces(board, type):
-    possibleMoves = checkSpacesState(board, type)
-    i = 0
-    while i < len(possibleMoves):
-        if (checkForMill(board, possibleMoves[i][0], possibleMoves[i][1], type)):
-            possibleMoves.pop(i)
-            i -= 1
-        i += 1
+    spaces = checkSpacesState(board, type)
+    possibleMoves = [space for space in spaces if not checkForMill(board, space[0], space[1], type)]
     if (len(possibleMoves) == 0):
-        possibleMoves = checkSpacesState(board, type)
+        return spaces
     return possibleMoves
 
 # with a piece ar row,col, determine the positions that the piece can move to
 def checkPossibleMoves(board, row, col):
     possibleMoves = []
-    if row != 3:
-        if col == 0:
-            if (board[3][3 - abs(3-row)] == 0):
-                possibleMoves.append([3, 3 - abs(3-row)])
-            if (board[row][1] == 0):
-                possibleMoves.append([row, 1])
-        elif col == 2:
-            if (board[3][2 + abs(3-row)] == 0):
-                possibleMoves.append([3, 2 + abs(3-row)])
-            if (board[row][1] == 0):
-                possibleMoves.append([row, 1])
-        else:
-            if (board[row][0] == 0):
-                possibleMoves.append([row, 0])
-            if (board[row][2] == 0):
-                possibleMoves.append([row, 2])
-            if row < 3:
-                if row < 2:
-                    if (board[row+1][1] == 0):
-                        possibleMoves.append([row+1, 1])
-                if row > 0:
-                    if (board[row-1][1] == 0):
-                        possibleMoves.append([row-1, 1])
-            if row > 3:
-                if row < 6:
-                    if (board[row+1][1] == 0):
-                        possibleMoves.append([row+1, 1])
-                if row > 4:
-                    if (board[row-1][1] == 0):
-                        possibleMoves.append([row-1, 1])
-    else:
-        if col < 3:
-            if (board[col][0] == 0):
-                possibleMoves.append([col, 0])
-            if (board[6-col][0] == 0):
-                possibleMoves.append([6-col, 0])
-            if col < 2:
-                if (board[3][col + 1] == 0):
-                    possibleMoves.append([3, col + 1])
-            elif col > 0:
-                if (board[3][col - 1] == 0):
-                    possibleMoves.append([3, col - 1])
-        else:
-            if (board[col + 1][2] == 0):
-                possibleMoves.append([col+1, 2])
-            if (board[6 - col - 1][2] == 0):
-                possibleMoves.append([6-col-1, 2])
-            if col > 3:
-                if (board[3][col - 1] == 0):
-                    possibleMoves.append([3, col - 1])
-            elif col < 6:
-                if (board[3][col + 1] == 0):
-                    possibleMoves.append([3, col + 1])
+    for position in NEIGHBOUR_INDEX[row][col]:
+        if (board[position[0]][position[1]] == 0):
+            possibleMoves.append(position)
     return possibleMoves
 
-# evaluation function for heuristic
+# evaluation function for heuristic, from the point of view of type 1
+# (material, centre and mobility are kept up to date by the board on every move)
 def evaluate(board, turn):
-    score = 0
-    blue_moves = checkSpacesState(board, 1)
-    orange_moves = checkSpacesState(board, -1)
-
-    center_positions = [[0,1],[1,1],[2,1],[4,1],[5,1],[6,1],[3,0],[3,1],[3,2],[3,3],[3,4],[3,5]]
     if (turn <= 20):
-        return (len(blue_moves) - len(orange_moves)) * 100
-    
-    score += (len(blue_moves) - len(orange_moves)) * 50
+        return (board.men[0] - board.men[1]) * PLACEMENT_MEN_WEIGHT
+    return (board.men[0] - board.men[1]) * MEN_WEIGHT + (board.centre[0] - board.centre[1]) * CENTRE_WEIGHT + (board.mobility[0] - board.mobility[1]) * MOBILITY_WEIGHT
 
-    for i in range(len(blue_moves)):
-        if blue_moves[i] in center_positions:
-            score += 10
-    for i in range(len(orange_moves)):
-        if orange_moves[i] in center_positions:
-            score -= 10
+# the turn that the stalemate counter continues from after a move
+def nextLastChanged(move, turn, lastChanged):
+    if turn <= 20 or move >> 10:
+        return turn + 1
+    return lastChanged
+
+
+# values of the positions after each of moves of the side to move, for a node with depth 1. the children that
+# end the game are scored like search would (for type 1), the rest are evaluated together by frontier.py
+def frontierValues(position, moves):
+    global nodes
+    side = position.side
+    turn = position.turn
+    lastChanged = position.lastChanged
+    before = nodes
+    nodes += len(moves)
+    if nodes >> 10 != before >> 10 and timeUp():
+        raise SearchTimeout()
+    if stats is not None:
+        stats.leaves += len(moves)
+        stats.frontierBatches += 1
+    men, centre, mobility = childTerms(position, side, moves)
+    if turn + 1 <= 20:
+        values = (men * PLACEMENT_MEN_WEIGHT).tolist()
+    else:
+        values = (men * MEN_WEIGHT + centre * CENTRE_WEIGHT + mobility * MOBILITY_WEIGHT).tolist()
+    other = 1 - side
+    # the player to move in the child has lost
+    lost = WIN_SCORE if side == 0 else -WIN_SCORE
+    for index, move in enumerate(moves):
+        childLastChanged = nextLastChanged(move, turn, lastChanged)
+        otherMen = position.men[other] - (move >> 10 != 0)
+        if turn + 1 > 20 and otherMen < 3:
+            values[index] = lost
+        elif turn + 1 - childLastChanged == 20:
+            values[index] = 0
+        elif turn + 1 > 20 and position.men[side] <= tablebases.maxMen and otherMen <= tablebases.maxMen:
+            source, target, remove = decodeMove(move)
+            pieces = position.pieces[:]
+            if source != -1:
+                pieces[side] &= ~(1 << source)
+            pieces[side] |= 1 << target
+            if remove != -1:
+                pieces[other] &= ~(1 << remove)
+            score = tablebaseScore(pieces, other, turn + 1, childLastChanged)
+            if score is not None:
+                values[index] = score
+    return values
 
-    for i in range(len(blue_moves)):
-        score += len(checkPossibleMoves(board, blue_moves[i][0], blue_moves[i][1]))*5
-    for i in range(len(orange_moves)):
-        score -= len(checkPossibleMoves(board, orange_moves[i][0], orange_moves[i][1]))*5
-    return score
+# exact score of a phase 2 or 3 position from the tablebases, with side to move, or None when the
+# tablebases do not have it. a win or a loss that takes longer than the stalemate counter allows
+# might end up as a draw, so it is left to the search
+def tablebaseScore(pieces, side, turn, lastChanged):
+    value = tablebases.probe(pieces[side], pieces[1 - side])
+    if value is None:
+        return None
+    result, turns = decodeValue(value)
+    if result == 0:
+        return 0
+    if turns >= 20 - (turn - lastChanged):
+        return None
+    score = result * (WIN_SCORE - turns)
+    return score if side == 0 else -score
 
 
-# max pruning function
-def maxPruning(board, depth, alpha, beta, turn, lastChanged):
+# negamax search with principal variation search: the value of position for the player to move, exact
+# when it lies between alpha and beta, otherwise a bound on the side of the window it fell out of.
+# the first move gets the full window, the later ones a null window that only proves them no better
+# than the best so far, and a move that is better anyway is searched again with the full window.
+# at the root (rootMoves are the moves to search, in order) the table cannot end the search since a move
+# is needed, and the best move is left in rootMove
+def search(position, depth, alpha, beta, rootMoves = None):
+    global nodes, rootMove, rootPartial
+    nodes += 1
+    if nodes & 1023 == 0 and timeUp():
+        raise SearchTimeout()
+    side = position.side
+    turn = position.turn
+    lastChanged = position.lastChanged
     # check if the position is at a loss
-    if turn > 20:
-        if (checkWinByNumber(board, -1)):
-            return -1000
+    if turn > 20 and position.men[side] < 3:
+        return -WIN_SCORE
     # check if the position is in a stalemate
     if turn - lastChanged == 20:
         return 0
+    # exact result from the tablebases
+    if turn > 20 and rootMoves is None and position.men[0] <= tablebases.maxMen and position.men[1] <= tablebases.maxMen:
+        score = tablebaseScore(position.pieces, side, turn, lastChanged)
+        if score is not None:
+            return score if side == 0 else -score
     # if depth = 0, then return the evaluation function
     if (depth == 0):
-        return evaluate(board, turn)
-    # if turn <= 20, this means that there are still pieces on hand.
-    if (turn <= 20):
-        # check for empty spaces that the player can put down
-        possibleMoves = checkSpacesState(board, 0)
-        for i in range(len(possibleMoves)):
-            # change the board accordingly
-            board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 1)
-            # if the move create a mill, move into this function
-            if (checkForMill(board, possibleMoves[i][0], possibleMoves[i][1], 1)):
-                # check for opponents' removable pieces
-                possibleRemoves = checkRemovableSpaces(board, -1)
-                for k in range(len(possibleRemoves)):
-                    board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], 0)
-                    # minimax
-                    value = minPruning(board, depth - 1, alpha, beta, turn + 1, turn + 1)
-                    if (value > beta):
-                        beta = value
-                    board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], -1)
-            else:
-                # minimax
-                value = minPruning(board, depth - 1, alpha, beta, turn + 1, turn + 1)
-                if (value > beta):
-                    beta = value
-            board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 0)
-            # alpha beta pruning
-            if alpha <= beta:
-                return alpha
-    # phase 2 and 3 where the player has to move the pieces on the table
-    elif (turn > 20):
-        # check all position of the player's pieces
-        ChoosablePieces = checkSpacesState(board, 1)
-        possibleMoves = []
-        for l in range(len(ChoosablePieces)):
-            # Check if the player can fly
-            if len(ChoosablePieces) == 3:
-                possibleMoves = checkSpacesState(board, 0)
-            else:
-                possibleMoves = checkPossibleMoves(board, ChoosablePieces[l][0], ChoosablePieces[l][1])
-            # everything else follow the same thing
-            board = changeBoardWithIndex(board, ChoosablePieces[l][0], ChoosablePieces[l][1], 0)
-            for i in range(len(possibleMoves)):
-                board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 1)
-                if (checkForMill(board, possibleMoves[i][0], possibleMoves[i][1], 1)):
-                    possibleRemoves = checkRemovableSpaces(board, -1)
-                    for k in range(len(possibleRemoves)):
-                        board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], 0)
-                        value = minPruning(board, depth - 1, alpha, beta, turn + 1, turn + 1)
-                        if (value > beta):
-                            beta = value
-                        board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], -1)
-                else:
-                    value = minPruning(board, depth - 1, alpha, beta, turn + 1, lastChanged)
-                    if (value > beta):
-                        beta = value
-                board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 0)
-                if alpha <= beta:
-                    board = changeBoardWithIndex(board, ChoosablePieces[l][0], ChoosablePieces[l][1], 1)
-                    return alpha
-            board = changeBoardWithIndex(board, ChoosablePieces[l][0], ChoosablePieces[l][1], 1)
-    return beta
-
-def minPruning(board, depth, alpha, beta, turn, lastChanged):
-    if turn > 20:
-        if (checkWinByNumber(board, 1)):
-            return 1000
-    if turn - lastChanged == 20:
-        return 0
-    if (depth == 0):
-        return evaluate(board, turn)
-    if (turn <= 20):
-        possibleMoves = checkSpacesState(board, 0)
-        for i in range(len(possibleMoves)):
-            board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], -1)
-            if (checkForMill(board, possibleMoves[i][0], possibleMoves[i][1], -1)):
-                possibleRemoves = checkRemovableSpaces(board, 1)
-                for k in range(len(possibleRemoves)):
-                    board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], 0)
-                    value = minPruning(board, depth - 1, alpha, beta, turn + 1, turn + 1)
-                    if (value < alpha):
-                        alpha = value
-                    board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], 1)
-            else:
-                value = maxPruning(board, depth - 1, alpha, beta, turn + 1, turn + 1)
-                if (value < alpha):
-                    alpha = value
-            board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 0)
-            if alpha <= beta:
-                return alpha
-            
-    elif (turn > 20):
-        ChoosablePieces = checkSpacesState(board, -1)
-        possibleMoves = []
-        for l in range(len(ChoosablePieces)):
-            if len(ChoosablePieces) == 3:
-                possibleMoves = checkSpacesState(board, 0)
-            else:
-                possibleMoves = checkPossibleMoves(board, ChoosablePieces[l][0], ChoosablePieces[l][1])
-            board = changeBoardWithIndex(board, ChoosablePieces[l][0], ChoosablePieces[l][1], 0)
-            for i in range(len(possibleMoves)):
-                board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], -1)
-                if (checkForMill(board, possibleMoves[i][0], possibleMoves[i][1], -1)):
-                    possibleRemoves = checkRemovableSpaces(board, 1)
-                    for k in range(len(possibleRemoves)):
-                        board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], 0)
-                        value = minPruning(board, depth - 1, alpha, beta, turn + 1, turn + 1)
-                        if (value < alpha):
-                            alpha = value
-                        board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], 1)
-                else:
-                    value = maxPruning(board, depth - 1, alpha, beta, turn + 1, lastChanged)
-                    if (value < alpha):
-                        alpha = value
-                board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 0)
-                if alpha <= beta:
-                    board = changeBoardWithIndex(board, ChoosablePieces[l][0], ChoosablePieces[l][1], -1)
-                    return alpha
-            board = changeBoardWithIndex(board, ChoosablePieces[l][0], ChoosablePieces[l][1], -1)
-    return alpha
-
-
-def makeMove(board, turn, lastChanged, isBlue):
-    # initialize depth, alpha and beta 
-    depth = 5
-    alpha = 2000
-    beta = -2000
+        if stats is not None:
+            stats.leaves += 1
+        score = evaluate(position, turn)
+        return score if side == 0 else -score
+    # look the position up in the transposition table. symmetric positions share one entry, keyed by the
+    # canonical version of the position, with the best move stored for the canonical version too
+    key, symmetry = position.canonicalHash()
+    key ^= stateKey(side, turn, lastChanged)
+    entry = table.probe(key)
+    if stats is not None:
+        stats.tableProbes += 1
+        stats.tableHits += entry is not None
+    tableMove = NO_MOVE
+    if entry is not None:
+        tableMove = transformMove(entry[3], INVERSE[symmetry])
+        if entry[0] >= depth and rootMoves is None:
+            if entry[1] == EXACT or (entry[1] == LOWER and entry[2] >= beta) or (entry[1] == UPPER and entry[2] <= alpha):
+                return entry[2]
+    ply = turn - rootTurn
+    alphaStart = alpha
+    best = -INFINITY
+    bestMove = NO_MOVE
+    if rootMoves is not None:
+        possibleMoves = rootMoves
+    elif depth == 1 and FRONTIER_AVAILABLE:
+        possibleMoves = position.generateMoves(side, turn, True)
+        if len(possibleMoves) >= FRONTIER_BATCH:
+            # at the frontier all the children are evaluated at once, which gives the best one without
+            # ordering the moves or searching them one by one
+            values = frontierValues(position, possibleMoves)
+            if side == 1:
+                values = [-value for value in values]
+            best = max(values)
+            bestMove = possibleMoves[values.index(best)]
+            if best >= beta:
+                ordering.cutoff(side, bestMove, depth, ply)
+            possibleMoves = ()
+        else:
+            possibleMoves = ordering.order(position, side, possibleMoves, tableMove, ply)
+    else:
+        # search the best move of the table first, then the other moves by how promising they are.
+        # the moves are generated as they are needed, so a cutoff saves generating the rest
+        possibleMoves = ordering.staged(position, side, turn, tableMove, ply)
+    for index, move in enumerate(possibleMoves):
+        position.make(move)
+        if index == 0:
+            value = -search(position, depth - 1, -beta, -alpha)
+        else:
+            value = -search(position, depth - 1, -alpha - 1, -alpha)
+            # the children of depth 1 are exact already
+            if alpha < value < beta and depth > 1:
+                value = -search(position, depth - 1, -beta, -alpha)
+        position.unmake()
+        if (value > best):
+            best = value
+            bestMove = move
+            if (value > alpha):
+                alpha = value
+                if rootMoves is not None:
+                    rootPartial = (value, move)
+        # alpha beta pruning
+        if alpha >= beta:
+            ordering.cutoff(side, move, depth, ply)
+            if stats is not None:
+                stats.cutoff(index)
+            break
+    # no move left means the player lost
+    if bestMove == NO_MOVE:
+        return -WIN_SCORE
+    if best <= alphaStart:
+        table.store(key, depth, UPPER, best, transformMove(bestMove, symmetry))
+    elif best >= beta:
+        table.store(key, depth, LOWER, best, transformMove(bestMove, symmetry))
+    else:
+        table.store(key, depth, EXACT, best, transformMove(bestMove, symmetry))
+    if rootMoves is not None:
+        rootMove = bestMove
+    return best
+
+# convert a move of the bitboard search into the text sent to the referee
+def moveToText(move, isBlue):
+    source, target, remove = decodeMove(move)
+    if source == -1:
+        firstMove = "h1" if isBlue else "h2"
+    else:
+        firstMove = bitToMove(source)
+    thirdMove = "r0" if remove == -1 else bitToMove(remove)
+    return firstMove + " " + bitToMove(target) + " " + thirdMove
+
+
+# search every move at the root with the window alpha, beta and return the best value and move
+def searchRoot(position, depth, alpha, beta, possibleMoves):
+    score = search(position, depth, alpha, beta, possibleMoves)
+    return score, rootMove
+
+# search the root with a small window around the score of the previous iteration,
+# and widen the window when the score falls outside of it
+def aspirationSearch(position, depth, guess, possibleMoves):
+    delta = ASPIRATION_WINDOW
+    alpha = -INFINITY
+    beta = INFINITY
+    if depth > 1:
+        alpha = guess - delta
+        beta = guess + delta
+    while True:
+        score, move = searchRoot(position, depth, alpha, beta, possibleMoves)
+        if score <= alpha:
+            alpha = max(score - delta, -INFINITY)
+        elif score >= beta:
+            beta = min(score + delta, INFINITY)
+        else:
+            return score, move
+        delta *= 4
+
+
+# iterative deepening: search depth firstDepth, firstDepth + 1... and start no new depth once soft seconds
+# after start have passed. the search stops in the middle of a depth hard seconds after start, and then
+# plays the best move of that depth if one already beat the others, otherwise the one of the depth before.
+# returns the best move, its score and the deepest depth that finished.
+# helper processes of the parallel search start one depth deeper on every other helper and
+# try the root moves after the first one in a rotated order (rotate), so they do not all search the same tree.
+# report(depth, score, move) is called after every finished depth
+def iterativeDeepening(board, turn, lastChanged, start, soft, hard, firstDepth = 1, rotate = 0, report = None):
+    global deadline, nodes, rootTurn, rootPartial
+    ordering.newSearch()
+    nodes = 0
+    rootTurn = turn
+    position = Position(board.pieces[0], board.pieces[1], 0, turn, lastChanged)
+    possibleMoves = ordering.order(position, 0, position.generateMoves(0, turn, True), NO_MOVE, 0)
+    if rotate and len(possibleMoves) > 2:
+        rotate %= len(possibleMoves) - 1
+        possibleMoves = possibleMoves[:1] + possibleMoves[1 + rotate:] + possibleMoves[1:1 + rotate]
+    # depth 1 always finishes so there is always a move to return
+    deadline = float("inf") if firstDepth == 1 else start + hard
+    bestMove = possibleMoves[0]
+    score = 0
+    reached = 0
+    for depth in range(firstDepth, MAX_DEPTH + 1):
+        rootPartial = None
+        try:
+            score, bestMove = aspirationSearch(position, depth, score, possibleMoves)
+        except SearchTimeout:
+            if rootPartial is not None:
+                score, bestMove = rootPartial
+            break
+        reached = depth
+        if report is not None:
+            report(depth, score, bestMove)
+        if stats is not None:
+            stats.iteration(depth, score, time.time() - start, nodes)
+        deadline = start + hard
+        # the next iteration starts with the best move of this one, the rest of the
+        # principal variation comes from the transposition table
+        possibleMoves.remove(bestMove)
+        possibleMoves.insert(0, bestMove)
+        # stop when the result is known, or when the next iteration would not finish in time
+        if abs(score) >= KNOWN_WIN or len(possibleMoves) == 1 or time.time() - start > soft:
+            break
+    return bestMove, score, reached
+
+
+# loop of a helper process of the parallel search: search every position it is given with the
+# transposition table in shared memory, report each finished depth and stop when told to
+def searchWorker(index, memoryName, sizeMB, tasks, results, stop):
+    global table, stopEvent
+    memory = attachMemory(memoryName)
+    table = TranspositionTable(sizeMB, memory.buf)
+    stopEvent = stop
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        searchNumber, mine, theirs, turn, lastChanged, start, soft, hard, age = task
+        table.age = age
+        report = lambda depth, score, move: results.put((searchNumber, depth, score, move))
+        iterativeDeepening(Board(mine, theirs), turn, lastChanged, start, soft, hard, 1 + index % 2, index, report)
+        # tell the main process this helper is done with the position
+        results.put((searchNumber, 0, 0, None))
+    table.release()
+    memory.close()
+
+# search each move with count processes (this one and count - 1 helpers) sharing one transposition table
+def setWorkers(count, sizeMB = None):
+    global WORKERS, TABLE_SIZE_MB, table, sharedMemory, results, stopEvent
+    if sizeMB is None:
+        sizeMB = TABLE_SIZE_MB
+    stopWorkers()
+    WORKERS = count
+    TABLE_SIZE_MB = sizeMB
+    if count <= 1:
+        table = TranspositionTable(sizeMB)
+        return
+    # only the parallel search needs multiprocessing, which takes a while to import
+    import multiprocessing
+    from multiprocessing import shared_memory
+    sharedMemory = shared_memory.SharedMemory(create = True, size = tableBytes(sizeMB))
+    table = TranspositionTable(sizeMB, sharedMemory.buf)
+    table.clear()
+    results = multiprocessing.Queue()
+    stopEvent = multiprocessing.Event()
+    for index in range(1, count):
+        tasks = multiprocessing.Queue()
+        process = multiprocessing.Process(target = searchWorker, args = (index, sharedMemory.name, sizeMB, tasks, results, stopEvent), daemon = True)
+        process.start()
+        helpers.append((process, tasks))
+
+# stop the helper processes and free the shared transposition table
+def stopWorkers():
+    global table, sharedMemory, stopEvent
+    for process, tasks in helpers:
+        tasks.put(None)
+    for process, tasks in helpers:
+        process.join(1)
+        if process.is_alive():
+            process.terminate()
+    helpers.clear()
+    stopEvent = None
+    if sharedMemory is not None:
+        table.release()
+        table = TranspositionTable(TABLE_SIZE_MB)
+        sharedMemory.close()
+        sharedMemory.unlink()
+        sharedMemory = None
+
+atexit.register(stopWorkers)
+
+
+# write records of every move to destination ("stderr" or a file path), or stop with None
+def setTelemetry(destination):
+    global telemetry
+    if telemetry is not None:
+        telemetry.close()
+    telemetry = None if destination is None else Telemetry(destination)
+
+# the telemetry record of a move: where it came from, the result of the search and the counters of stats
+def writeTelemetry(turn, move, source, score, depth, start):
+    seconds = time.time() - start
+    record = {"turn": turn, "move": move, "source": source, "score": score, "depth": depth,
+              "seconds": round(seconds, 4), "nodes": nodes, "nps": int(nodes / max(seconds, 1e-6)), "workers": WORKERS}
+    record.update(stats.toDict())
+    telemetry.write(record)
+
+# the best move of type 1 on board (a Board with moves left): from the opening book, or searched by this
+# process and the helpers with the soft and hard budgets (see iterativeDeepening). returns the move,
+# its score and the depth of the search, with score None and depth 0 for a book move
+def searchMove(board, turn, lastChanged, start, soft, hard):
+    global searchNumber
+    # placement positions in the book need no search
+    if turn <= 20 and openingBook is not None:
+        bookMove = openingBook.lookup(board.pieces[0], board.pieces[1], turn)
+        if bookMove is not None and board.isLegal(0, turn, bookMove):
+            return bookMove, None, 0
+    table.newSearch()
+    # give the position to the helpers (if any), then search it here as well
+    if helpers:
+        searchNumber += 1
+        stopEvent.clear()
+        for process, tasks in helpers:
+            tasks.put((searchNumber, board.pieces[0], board.pieces[1], turn, lastChanged, start, soft, hard, table.age))
+    bestMove, score, depth = iterativeDeepening(board, turn, lastChanged, start, soft, hard)
+    if helpers:
+        stopEvent.set()
+        # keep the deepest depth finished by any process
+        done = 0
+        while done < len(helpers):
+            try:
+                number, helperDepth, helperScore, helperMove = results.get(timeout = 0.5)
+            except queue.Empty:
+                break
+            if number != searchNumber:
+                continue
+            if helperMove is None:
+                done += 1
+            elif helperDepth > depth:
+                bestMove, score, depth = helperMove, helperScore, helperDepth
+    return bestMove, score, depth
+
+# whether move of type 1 on board is worth at least bound, by a null window search of depth plies.
+# a move that cannot be checked before timeLimit seconds after start is not
+def moveReaches(board, turn, lastChanged, move, depth, bound, start, timeLimit):
+    global deadline, nodes, rootTurn
+    nodes = 0
+    rootTurn = turn
+    deadline = start + timeLimit
+    position = Position(board.pieces[0], board.pieces[1], 0, turn, lastChanged)
+    position.make(move)
+    try:
+        value = -search(position, depth - 1, -bound, -bound + 1)
+    except SearchTimeout:
+        return False
+    return value >= bound
+
+# the text of the move of type 1 on the list board. start is time.time() when the referee asked for it
+# (now by default), and the move has the time of clock, or timeLimit seconds with no margin when given
+def makeMove(board, turn, lastChanged, isBlue, timeLimit = None, start = None):
+    global stats
+    if start is None:
+        start = time.time()
+    stats = None if telemetry is None else SearchStats()
+    board = Board.fromList(board)
     if turn > 20:
-        if (checkWinByNumber(board, 1)):
+        if board.men[1] < 3:
             return "I won"
-        if (checkWinByNumber(board, -1)):
+        if board.men[0] < 3:
             return "I lost"
     if turn - lastChanged == 20:
         return "draw"
-    firstMove = ""
-    secondMove = ""
-    thirdMove = "r0"
-    # everything also follows max pruning function except when the value is larger than beta, update the move
-    if (turn <= 20):
-        firstMove = "h2"
-        if (isBlue):
-            firstMove = "h1"
-        possibleMoves = checkSpacesState(board, 0)
-        for i in range(len(possibleMoves)):
-            board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 1)
-            if (checkForMill(board, possibleMoves[i][0], possibleMoves[i][1], 1)):
-                possibleRemoves = checkRemovableSpaces(board, -1)
-                for k in range(len(possibleRemoves)):
-                    board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], 0)
-                    value = minPruning(board, depth, alpha, beta, turn + 1, turn + 1)
-                    if (value > beta):
-                        beta = value
-                        secondMove = indexToMove(possibleMoves[i][0], possibleMoves[i][1])
-                        thirdMove = indexToMove(possibleRemoves[k][0], possibleRemoves[k][1])
-                    board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], -1)
-            else:
-                value = minPruning(board, depth, alpha, beta, turn + 1, turn + 1)
-                if (value > beta):
-                    beta = value
-                    secondMove = indexToMove(possibleMoves[i][0], possibleMoves[i][1])
-                    thirdMove = "r0"
-            board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 0)
-    elif (turn > 20):
-        ChoosablePieces = checkSpacesState(board, 1)
-        possibleMoves = []
-        for l in range(len(ChoosablePieces)):
-            if len(ChoosablePieces) == 3:
-                possibleMoves = checkSpacesState(board, 0)
-            else:
-                possibleMoves = checkPossibleMoves(board, ChoosablePieces[l][0], ChoosablePieces[l][1])
-            if (len(possibleMoves) == 0):
-                continue
-            board = changeBoardWithIndex(board, ChoosablePieces[l][0], ChoosablePieces[l][1], 0)
-            for i in range(len(possibleMoves)):
-                board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 1)
-                if (checkForMill(board, possibleMoves[i][0], possibleMoves[i][1], 1)):
-                    possibleRemoves = checkRemovableSpaces(board, -1)
-                    for k in range(len(possibleRemoves)):
-                        board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], 0)
-                        value = minPruning(board, depth, alpha, beta, turn + 1, turn + 1)
-                        if (value > beta):
-                            beta = value
-                            firstMove = indexToMove(ChoosablePieces[l][0], ChoosablePieces[l][1])
-                            secondMove = indexToMove(possibleMoves[i][0], possibleMoves[i][1])
-                            thirdMove = indexToMove(possibleRemoves[k][0], possibleRemoves[k][1])
-                        board = changeBoardWithIndex(board, possibleRemoves[k][0], possibleRemoves[k][1], -1)
-                else:
-                    value = minPruning(board, depth, alpha, beta, turn + 1, lastChanged)
-                    if (value > beta):
-                        beta = value
-                        firstMove = indexToMove(ChoosablePieces[l][0], ChoosablePieces[l][1])
-                        secondMove = indexToMove(possibleMoves[i][0], possibleMoves[i][1])
-                        thirdMove = "r0"
-                board = changeBoardWithIndex(board, possibleMoves[i][0], possibleMoves[i][1], 0)
-            board = changeBoardWithIndex(board, ChoosablePieces[l][0], ChoosablePieces[l][1], 1)
-    return firstMove + " " + secondMove + " " + thirdMove
+    possibleMoves = board.generateMoves(0, turn)
+    if not possibleMoves:
+        return "I lost"
+    manager = clock if timeLimit is None else TimeManager(timeLimit, 0.0)
+    soft, hard = manager.budgets(turn, board.men[0], len(possibleMoves))
+    bestMove, score, depth = searchMove(board, turn, lastChanged, start, soft, hard)
+    if stats is not None:
+        writeTelemetry(turn, moveToText(bestMove, isBlue), "search" if depth else "book", score, depth, start)
+    return moveToText(bestMove, isBlue)
+
+# think on the opponent's time: while main() waits for the opponent's move, search the position
+# with the opponent to move (so all of its replies) deeper and deeper in a background thread.
+# everything found stays in the transposition table, where the next makeMove picks it up
+def startPondering(board, turn, lastChanged):
+    global ponderThread, ponderStop
+    stopPondering()
+    ponderStop = threading.Event()
+    board = Board.fromList(board)
+    position = Position(board.pieces[0], board.pieces[1], 1, turn, lastChanged)
+    ponderThread = threading.Thread(target = ponder, args = (position, ponderStop), daemon = True)
+    ponderThread.start()
+
+def ponder(position, stop):
+    global deadline, nodes, rootTurn
+    turn = position.turn
+    if (turn > 20 and min(position.men) < 3) or turn - position.lastChanged >= 20:
+        return
+    # entries of the pondering are of a search of its own, like those of makeMove
+    table.newSearch()
+    ordering.newSearch()
+    nodes = 0
+    rootTurn = turn
+    deadline = float("inf")
+    for depth in range(1, MAX_DEPTH + 1):
+        try:
+            score = search(position, depth, -INFINITY, INFINITY)
+        except SearchTimeout:
+            break
+        if stop.is_set() or abs(score) >= KNOWN_WIN:
+            break
+
+# stop the pondering thread (the move of the opponent arrived)
+def stopPondering():
+    global ponderThread, ponderStop
+    if ponderThread is not None:
+        ponderStop.set()
+        ponderThread.join()
+        ponderThread = None
+        ponderStop = None
 
 def makeRandomMove(board, turn, isBlue):
     firstMove = ""
@@ -502,11 +724,19 @@ def makeRandomMove(board, turn, isBlue):
     return firstMove + " " + secondMove + " " + thirdMove
 
 def main():
+    # WORKERS=n in the environment searches with n processes
+    if int(os.getenv("WORKERS", "1")) > 1:
+        setWorkers(int(os.getenv("WORKERS")))
+    # TELEMETRY=stderr or TELEMETRY=<file> writes what the search did for each move
+    if os.getenv("TELEMETRY"):
+        setTelemetry(os.getenv("TELEMETRY"))
     board = [[0, 0, 0],[0, 0, 0],[0, 0, 0],[0, 0, 0, 0, 0, 0],[0, 0, 0],[0, 0, 0],[0, 0, 0]]
     blue = True
     myTurn = False
     turns = 0
     lastChanged = 21
+    # the moves of both players, logged when the game is over (see gameRecord.py)
+    record = []
     game_input = input().strip()
     if game_input == "blue":
         myTurn = True
@@ -516,9 +746,13 @@ def main():
         try:
             if (myTurn):
                 turns += 1
-                # move = makeMove(board, turns, lastChanged, blue)
-                move = makeRandomMove(board, turns, blue)
+                # the first move of blue also pays for starting the program
+                move = makeMove(board, turns, lastChanged, blue, start = STARTED if turns == 1 else None)
+                # the game is over, the referee ends it
+                if move in ("I won", "I lost", "draw"):
+                    break
                 print(move, flush = True)
+                record.append(textToMove(move))
                 board = changeBoard(board, move, 1)
                 myTurn = False
                 if turns > 20:
@@ -526,8 +760,14 @@ def main():
                         lastChanged = turns
             
             else:
-                move = input().strip()
+                # search on the opponent's time until its move arrives
+                startPondering(board, turns + 1, lastChanged)
+                try:
+                    move = input().strip()
+                finally:
+                    stopPondering()
                 board = changeBoard(board, move, -1)
+                record.append(textToMove(move))
                 myTurn = True
                 turns += 1
                 if turns > 20:
@@ -535,6 +775,7 @@ def main():
                         lastChanged = turns
         except EOFError:
             break
+    appendGame(GAME_LOG, blue, record)
 
 if __name__ == "__main__":
     main()
@@ -1,46 +1,66 @@
-from google import genai
-from google.genai import types
-import os
-from dotenv import load_dotenv
 import time
+# the clock of the referee starts before the imports below are done, the first move counts from here
+STARTED = time.time()
+
+# google.genai, dotenv, asyncio and sqlite3 (for modelCache) are imported where they are first
+# needed, they take much longer to import than the bot takes to start
+import os
+import re
+import sys
+import atexit
 import random
+import threading
+from geometry import ROW_START, NAMES, POINT_OF_NAME, POINTS, NEIGHBOUR_INDEX, MILL_INDEX
+from bitboard import Board
+from zobrist import handCounts
+from timeManager import TimeManager
+from gameRecord import GAME_LOG, textToMove, appendGame
+import wolflieu
+
+
+# the settings of the model, read by loadSettings() from the environment and the .env file:
+# the key of the API, the model asked for a move, and LLM_BASE_URL to send the requests to another
+# server than Google's (a local stub server in tests)
+api_key = None
+modelName = "gemini-2.0-flash"
+baseUrl = None
+settingsLoaded = False
 
+# the budgets of the time of each move (see timeManager.py), and the seconds at the end of the
+# hard budget kept for checking the move of the model
+clock = TimeManager()
+CHECK_TIME = 0.4
+# the move of the model is played when the search scores it at most this much below its own best move
+MODEL_MARGIN = 10
+# a move of the model found in the cache is checked by a search with this part of the soft budget
+CACHED_SHARE = 0.1
 
-load_dotenv()
-api_key = os.getenv("API_KEY")
-client = genai.Client(api_key = api_key)
+# the client of the model and the settings of every request (the rules as the system prompt),
+# made by warmUp() on the opponent's time and kept for the whole game, and the thread making them
+client = None
+config = None
+warmUpThread = None
+
+# the moves the model answered before (see modelCache.py), opened on the first move, None when it is off.
+# MODEL_CACHE in the environment is the file to keep them in instead of modelCache.CACHE_FILE, "" for none
+CACHE_FILE = os.getenv("MODEL_CACHE")
+cache = None
+
+# the event loop running the requests to the model, kept between moves like the client bound to it
+loop = None
+
+# a move in the answer of the model
+MOVE_PATTERN = re.compile(r"\b(h[12]|[a-g][1-7]) ([a-g][1-7]) (r0|[a-g][1-7])\b")
 
 #convert the text to move in array
 def moveToIndex(str):
-    if (str == "h1" or str == "r0"):
+    if (str not in POINT_OF_NAME):
         return [-1, -1]
-    col = ord(str[0]) - 97
-    row = 7 - int(str[1])
-    if (row != 3):
-        if (col < 3):
-            col = 0
-        elif (col > 3):
-            col = 2
-        else:
-            col = 1
-    else:
-        if col > 3:
-            col -= 1
-    return [row, col]
+    return POINTS[POINT_OF_NAME[str]]
 
 # convert the move from number in array into text
 def indexToMove(row, col):
-    if (row == 3):
-        if (col < 3):
-            return chr(col + 97) + "4"
-        else:
-            return chr(col + 97 + 1) + "4"
-    if (col == 1):
-        return "d" + str(7 - row)
-    if (col < 1):
-        return chr(100 - abs(3 - row)) + str(7 - row)
-    else:
-        return chr(100 + abs(3 - row)) + str(7 - row)
+    return NAMES[ROW_START[row] + col]
     
 # return all the positions of the board where the position = type
 def checkSpacesState(board, type):
@@ -88,113 +108,25 @@ def changeBoard(board, move, type):
 
 # Check for mill based on the row and column used
 def checkForMill(board, row, col, type):
-    if (row != 3):
-        for i in range(3):
-            if (board[row][i] != type):
-                break
-            if (i == 2):
-                return True
-        if col == 0:
-            if (board[6-row][col] == type and board[3][3 - abs(3-row)] == type):
-                return True
-        elif col == 2:
-            if (board[6-row][col] == type and board[3][2 + abs(3-row)] == type):
-                return True
-        else:
-            if row < 3:
-                if (board[0][1] == type and board[1][1] == type and board[2][1] == type):
-                    return True
-            else:
-                if (board[4][1] == type and board[5][1] == type and board[6][1] == type):
-                    return True
-    else:
-        if col < 3:
-            for i in range(3):
-                if (board[3][i] != type):
-                    break
-                if (i == 2):
-                    return True
-            if (board[col][0] == type and board[6 - col][0] == type):
-                return True
-        else:
-            for i in range(3):
-                if (board[3][i + 3] != type):
-                    break
-                if (i == 2):
-                    return True
-            if (board[col + 1][2] == type and board[6 - col - 1][2] == type):
-                return True
+    for mill in MILL_INDEX[row][col]:
+        if (board[mill[0][0]][mill[0][1]] == type and board[mill[1][0]][mill[1][1]] == type):
+            return True
     return False
 
 # check for opponent pieces that is not in mill. If all pieces are in a mill, return all opponents pieces
 def checkRemovableSpaces(board, type):
-    possibleMoves = checkSpacesState(board, type)
-    i = 0
-    while i < len(possibleMoves):
-        if (checkForMill(board, possibleMoves[i][0], possibleMoves[i][1], type)):
-            possibleMoves.pop(i)
-            i -= 1
-        i += 1
+    spaces = checkSpacesState(board, type)
+    possibleMoves = [space for space in spaces if not checkForMill(board, space[0], space[1], type)]
     if (len(possibleMoves) == 0):
-        possibleMoves = checkSpacesState(board, type)
+        return spaces
     return possibleMoves
 
 # with a piece ar row,col, determine the positions that the piece can move to
 def checkPossibleMoves(board, row, col):
     possibleMoves = []
-    if row != 3:
-        if col == 0:
-            if (board[3][3 - abs(3-row)] == 0):
-                possibleMoves.append([3, 3 - abs(3-row)])
-            if (board[row][1] == 0):
-                possibleMoves.append([row, 1])
-        elif col == 2:
-            if (board[3][2 + abs(3-row)] == 0):
-                possibleMoves.append([3, 2 + abs(3-row)])
-            if (board[row][1] == 0):
-                possibleMoves.append([row, 1])
-        else:
-            if (board[row][0] == 0):
-                possibleMoves.append([row, 0])
-            if (board[row][2] == 0):
-                possibleMoves.append([row, 2])
-            if row < 3:
-                if row < 2:
-                    if (board[row+1][1] == 0):
-                        possibleMoves.append([row+1, 1])
-                if row > 0:
-                    if (board[row-1][1] == 0):
-                        possibleMoves.append([row-1, 1])
-            if row > 3:
-                if row < 6:
-                    if (board[row+1][1] == 0):
-                        possibleMoves.append([row+1, 1])
-                if row > 4:
-                    if (board[row-1][1] == 0):
-                        possibleMoves.append([row-1, 1])
-    else:
-        if col < 3:
-            if (board[col][0] == 0):
-                possibleMoves.append([col, 0])
-            if (board[6-col][0] == 0):
-                possibleMoves.append([6-col, 0])
-            if col < 2:
-                if (board[3][col + 1] == 0):
-                    possibleMoves.append([3, col + 1])
-            elif col > 0:
-                if (board[3][col - 1] == 0):
-                    possibleMoves.append([3, col - 1])
-        else:
-            if (board[col + 1][2] == 0):
-                possibleMoves.append([col+1, 2])
-            if (board[6 - col - 1][2] == 0):
-                possibleMoves.append([6-col-1, 2])
-            if col > 3:
-                if (board[3][col - 1] == 0):
-                    possibleMoves.append([3, col - 1])
-            elif col < 6:
-                if (board[3][col + 1] == 0):
-                    possibleMoves.append([3, col + 1])
+    for position in NEIGHBOUR_INDEX[row][col]:
+        if (board[position[0]][position[1]] == 0):
+            possibleMoves.append(position)
     return possibleMoves
 
 # make random move as a fallback option
@@ -265,60 +197,215 @@ def makeRandomMove(board, turn, isBlue):
     
     return firstMove + " " + secondMove + " " + thirdMove
 
-def makeMove(board, turns, blue):
-    instruction = "Please return the asnswer in 4.5 seconds"
-    instruction += "This is a game called larsker morris, I want you to provide the best move possible. Here is how I symbolize the positions: The board has the following format:\n"
-    instruction += "a7\t\t\td7\t\t\tg7\n"
-    instruction += "\tb6\t\td6\t\tf6\t\n"
-    instruction += "\t\tc5\td5\te5\t\t\n"
-    instruction += "a4\tb4\tc4\t\te4\tf4\tg4\n"
-    instruction += "\t\tc3\td3\te3\t\t\n"
-    instruction += "\tb2\t\td2\t\tf2\t\n"
-    instruction += "a1\t\t\td1\t\t\tg1\n"
-    instruction += "you will win the game when you make the opponent doesn't have any move left or the total number of mills on hand and on board equals to 2.\n"
-    instruction += "you will have a mill when the move you just made create a 3 consecutive positions of your man vertically or horizontally. For example, a4 b4 c4, b2 b4 b6 are valid mills while a7 b6 c5 and b4 c4 e4 are not valid mills. When a mill is created, you MUST remove the opponent's man that is not in mill unless all of the opponent's man are in mill"
-    instruction += "try to create as much mill as possible, you can break a mill and make it back in order to create a mill again."
-    instruction += "In phase 1 (when you still have pieces on hand, if you are blue, decode the first part as h1, if you are orange, decode the first part as h2.) The second part would be the position of the man you want to put in, and the third part would be the position of the opponent that you want to remove if you have a mill. If you don't have a mill, the third part would be r0\n"
-    instruction += "In phase 2 (when you don't have any pieces on hand and you have more than 3 man), the first part would be the man that you want to move, the second part is the postion than you want your man to move to (in this phase, you can only move your man to a position next to the previous position), and again, the third part would be the position of the opponent that you want to remove if you have a mill. If you don't have a mill, the third part would be r0\n"
-    instruction += "In phase 3 (when you only have 3 man left), the first part would be the man that you want to move, the second part is the postion than you want your man to move to (in this phase, you can move your man to any empty spaces), and again, the third part would be the position of the opponent that you want to remove if you have a mill. If you don't have a mill, the third part would be r0\n"
-    instruction += "Some examples are h1 d3 r0 (the blue player takes the man on hand and put in position d3. Since it didn't create a mill, the third part is r0), a7 a4 d3 (the player move it's man from position a7 to a4 and since it create a mill, the player must remove a mam from the opponent and the choice is d3."
-    
+INSTRUCTION = "This is a game called larsker morris, I want you to provide the best move possible. Here is how I symbolize the positions: The board has the following format:\n"
+INSTRUCTION += "a7\t\t\td7\t\t\tg7\n"
+INSTRUCTION += "\tb6\t\td6\t\tf6\t\n"
+INSTRUCTION += "\t\tc5\td5\te5\t\t\n"
+INSTRUCTION += "a4\tb4\tc4\t\te4\tf4\tg4\n"
+INSTRUCTION += "\t\tc3\td3\te3\t\t\n"
+INSTRUCTION += "\tb2\t\td2\t\tf2\t\n"
+INSTRUCTION += "a1\t\t\td1\t\t\tg1\n"
+INSTRUCTION += "you will win the game when you make the opponent doesn't have any move left or the total number of mills on hand and on board equals to 2.\n"
+INSTRUCTION += "you will have a mill when the move you just made create a 3 consecutive positions of your man vertically or horizontally. For example, a4 b4 c4, b2 b4 b6 are valid mills while a7 b6 c5 and b4 c4 e4 are not valid mills. When a mill is created, you MUST remove the opponent's man that is not in mill unless all of the opponent's man are in mill"
+INSTRUCTION += "try to create as much mill as possible, you can break a mill and make it back in order to create a mill again."
+INSTRUCTION += "In phase 1 (when you still have pieces on hand, if you are blue, decode the first part as h1, if you are orange, decode the first part as h2.) The second part would be the position of the man you want to put in, and the third part would be the position of the opponent that you want to remove if you have a mill. If you don't have a mill, the third part would be r0\n"
+INSTRUCTION += "In phase 2 (when you don't have any pieces on hand and you have more than 3 man), the first part would be the man that you want to move, the second part is the postion than you want your man to move to (in this phase, you can only move your man to a position next to the previous position), and again, the third part would be the position of the opponent that you want to remove if you have a mill. If you don't have a mill, the third part would be r0\n"
+INSTRUCTION += "In phase 3 (when you only have 3 man left), the first part would be the man that you want to move, the second part is the postion than you want your man to move to (in this phase, you can move your man to any empty spaces), and again, the third part would be the position of the opponent that you want to remove if you have a mill. If you don't have a mill, the third part would be r0\n"
+INSTRUCTION += "Some examples are h1 d3 r0 (the blue player takes the man on hand and put in position d3. Since it didn't create a mill, the third part is r0), a7 a4 d3 (the player move it's man from position a7 to a4 and since it create a mill, the player must remove a mam from the opponent and the choice is d3."
+
+# read the settings of the model, the first time only
+def loadSettings():
+    global api_key, modelName, baseUrl, settingsLoaded
+    if settingsLoaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_key = os.getenv("API_KEY")
+    modelName = os.getenv("LLM_MODEL", modelName)
+    baseUrl = os.getenv("LLM_BASE_URL")
+    settingsLoaded = True
+
+# the client of the model and the settings of the requests, made on the first call
+def getClient():
+    global client, config
+    if client is None:
+        from google import genai
+        from google.genai import types
+        options = None
+        if baseUrl:
+            options = types.HttpOptions(base_url = baseUrl)
+        client = genai.Client(api_key = api_key, http_options = options)
+        config = types.GenerateContentConfig(system_instruction = INSTRUCTION)
+    return client
+
+# read the settings and make the client in a background thread, the first time only. importing
+# google.genai takes longer than a short move, so it happens while the bot waits for the opponent
+def startWarmUp():
+    global warmUpThread
+    if warmUpThread is None:
+        warmUpThread = threading.Thread(target = warmUp, daemon = True)
+        warmUpThread.start()
+
+def warmUp():
+    loadSettings()
+    if api_key is not None:
+        getClient()
+
+# the question asked to the model about the board at turn
+def modelContent(board, turn, blue):
     content = "In this game, you are "
     content += "blue. " if blue else "orange. "
     content += "What is the best possible move for you?\n"
-    if turns <= 20:
-        content += "You have "
-        if blue:
-            num = (20 - turns)/2
-            content += str(num)
-        else:
-            num = (20 - turns + 1)/2
-            content += str(num)
-        content += " pieces on hand\n"
+    if turn <= 20:
+        content += "You have " + str(handCounts(turn)[0]) + " pieces on hand\n"
     else:
         content += "You don't have any pieces on hand\n"
-    
     content += "The board is as follows: (1 is your man, 0 is empty, -1 is the opponent's man\n"
     content += printBoard(board)
     content += "You just need to give out the move, nothing else"
+    return content
+
+# ask the model for a move and return the text of its answer, or None when it fails or
+# has not answered at time.time() until
+async def askModel(board, turn, blue, until):
+    import asyncio
+    try:
+        request = getClient().aio.models.generate_content(
+            model = modelName,
+            config = config,
+            contents = [modelContent(board, turn, blue)]
+        )
+        response = await asyncio.wait_for(request, until - time.time())
+        return response.text
+    except Exception:
+        return None
+
+# the legal move in the answer of the model, or None when there is none
+def modelMove(answer, legal):
+    if answer is None:
+        return None
+    for match in MOVE_PATTERN.finditer(answer):
+        move = legal.get(" ".join(match.groups()))
+        if move is not None:
+            return move
+    return None
+
+# the cache of model moves, opened on the first call
+def getCache():
+    global cache
+    if cache is None and CACHE_FILE != "":
+        import modelCache
+        cache = modelCache.ModelCache(modelCache.CACHE_FILE if CACHE_FILE is None else CACHE_FILE)
+        atexit.register(closeCache)
+    return cache
 
-    sys_instruct = instruction
-    client = genai.Client(api_key=api_key)
+# write the counters of the cache to stderr and close it
+def closeCache():
+    global cache
+    if cache is not None:
+        summary = cache.summary()
+        cache.close()
+        cache = None
+        print("model cache:", int(summary["hits"]), "hits,", int(summary["misses"]), "misses,",
+              "%.1f s saved" % summary["savedSeconds"], file = sys.stderr)
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        config=types.GenerateContentConfig(
-            system_instruction=sys_instruct),
-        contents=[content]
-    )
-    # return (response.text[0:8])
-    return makeRandomMove(board, turns, blue)
+# the move the model answered for position before, when it is in the cache and legal, otherwise None
+def cachedMove(position, turn, blue):
+    cache = getCache()
+    if cache is None:
+        return None
+    move = cache.lookup(position.pieces[0], position.pieces[1], turn, blue)
+    if move is not None and position.isLegal(0, turn, move):
+        return move
+    return None
+
+# the legal move in the answer of the model on position (the Board of board), which goes into the cache.
+# None when the answer has no legal move or does not come before time.time() until
+async def modelAnswer(board, position, turn, blue, legal, until):
+    cache = getCache()
+    # the model is not asked before the client is ready
+    startWarmUp()
+    if warmUpThread.is_alive() or client is None:
+        return None
+    asked = time.time()
+    move = modelMove(await askModel(board, turn, blue, until), legal)
+    if cache is not None:
+        cache.request(time.time() - asked)
+        if move is not None:
+            cache.store(position.pieces[0], position.pieces[1], turn, blue, move)
+    return move
+
+# ask the model while the search runs, then play the search's move unless the model answered in time
+# with a legal move the search scores within MODEL_MARGIN of its own. a move of the model in the cache
+# only waits for a short search to check it
+async def chooseMove(board, turn, lastChanged, blue, start, soft, hard):
+    import asyncio
+    position = Board.fromList(board)
+    legal = {wolflieu.moveToText(move, blue): move for move in position.generateMoves(0, turn)}
+    # without the time to check an answer of the model the search gets all of it
+    if hard < 2 * CHECK_TIME:
+        bestMove, score, depth = await asyncio.to_thread(wolflieu.searchMove, position, turn, lastChanged, start, soft, hard)
+        return bestMove
+    searchHard = hard - CHECK_TIME
+    cached = cachedMove(position, turn, blue)
+    if cached is not None:
+        bestMove, score, depth = await asyncio.to_thread(wolflieu.searchMove, position, turn, lastChanged, start, min(soft * CACHED_SHARE, searchHard), searchHard)
+        if depth == 0 or abs(score) >= wolflieu.KNOWN_WIN or len(legal) == 1 or cached == bestMove:
+            return bestMove
+        if await asyncio.to_thread(wolflieu.moveReaches, position, turn, lastChanged, cached, depth, score - MODEL_MARGIN, start, hard):
+            return cached
+        # the model was wrong about this position before, so it is not asked again, and the move of the
+        # search takes the place of its move so the next visit does not check it again
+        bestMove, score, depth = await asyncio.to_thread(wolflieu.searchMove, position, turn, lastChanged, start, min(soft, searchHard), searchHard)
+        getCache().store(position.pieces[0], position.pieces[1], turn, blue, bestMove)
+        return bestMove
+    model = asyncio.ensure_future(modelAnswer(board, position, turn, blue, legal, start + searchHard))
+    try:
+        bestMove, score, depth = await asyncio.to_thread(wolflieu.searchMove, position, turn, lastChanged, start, min(soft, searchHard), searchHard)
+        # a book move or a known result cannot be improved
+        if depth == 0 or abs(score) >= wolflieu.KNOWN_WIN or len(legal) == 1:
+            return bestMove
+        move = await model
+    finally:
+        model.cancel()
+    if move is None or move == bestMove:
+        return bestMove
+    good = await asyncio.to_thread(wolflieu.moveReaches, position, turn, lastChanged, move, depth, score - MODEL_MARGIN, start, hard)
+    return move if good else bestMove
+
+# the text of the move of type 1 on the list board. start is time.time() when the referee asked for it
+# (now by default), and the move has the time of clock, or timeLimit seconds with no margin when given
+def makeMove(board, turn, lastChanged, blue, timeLimit = None, start = None):
+    global loop
+    if start is None:
+        start = time.time()
+    position = Board.fromList(board)
+    if turn > 20:
+        if position.men[1] < 3:
+            return "I won"
+        if position.men[0] < 3:
+            return "I lost"
+    if turn - lastChanged == 20:
+        return "draw"
+    possibleMoves = position.generateMoves(0, turn)
+    if not possibleMoves:
+        return "I lost"
+    manager = clock if timeLimit is None else TimeManager(timeLimit, 0.0)
+    soft, hard = manager.budgets(turn, position.men[0], len(possibleMoves))
+    if loop is None:
+        import asyncio
+        loop = asyncio.new_event_loop()
+    move = loop.run_until_complete(chooseMove(board, turn, lastChanged, blue, start, soft, hard))
+    return wolflieu.moveToText(move, blue)
 
 def main():
     board = [[0, 0, 0],[0, 0, 0],[0, 0, 0],[0, 0, 0, 0, 0, 0],[0, 0, 0],[0, 0, 0],[0, 0, 0]]
     blue = True
     myTurn = False
     turns = 0
+    lastChanged = 21
+    # the moves of both players, logged when the game is over (see gameRecord.py)
+    record = []
     game_input = input().strip()
     if game_input == "blue":
         myTurn = True
@@ -327,23 +414,38 @@ def main():
     while True:
         try:
             if (myTurn):
-                start = time.time()
-                move = makeMove(board, turns, blue)
-                end = time.time()
-                if (end - start < 4):
-                    time.sleep(4 - end + start)
                 turns += 1
+                # the first move of blue also pays for starting the program
+                move = makeMove(board, turns, lastChanged, blue, start = STARTED if turns == 1 else None)
+                # the game is over, the referee ends it
+                if move in ("I won", "I lost", "draw"):
+                    break
                 print(move, flush = True)
+                record.append(textToMove(move))
                 board = changeBoard(board, move, 1)
                 myTurn = False
+                if turns > 20:
+                    if move[7] != "0":
+                        lastChanged = turns
             
             else:
-                move = input().strip()
+                # search on the opponent's time until its move arrives
+                wolflieu.startPondering(board, turns + 1, lastChanged)
+                startWarmUp()
+                try:
+                    move = input().strip()
+                finally:
+                    wolflieu.stopPondering()
                 board = changeBoard(board, move, -1)
+                record.append(textToMove(move))
                 myTurn = True
                 turns += 1
+                if turns > 20:
+                    if move[7] != "0":
+                        lastChanged = turns
         except EOFError:
             break
+    appendGame(GAME_LOG, blue, record)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
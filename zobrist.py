@@ -0,0 +1,59 @@
+# Zobrist keys used to hash positions for the transposition table.
+# the keys come from a fixed seed so every process (and every run) hashes the same way.
+import random
+
+import geometry
+import snapshot
+import symmetry
+from symmetry import PERMUTATIONS
+
+# the keys (see below), built when there is no snapshot of them (see snapshot.py)
+def buildKeys():
+    generator = random.Random(4341)
+
+    def key():
+        return generator.getrandbits(64)
+
+    # PIECE_KEYS[side][point]: a man of side (0 = type 1, 1 = type -1) on point
+    pieceKeys = [[key() for point in range(24)] for side in range(2)]
+    # SYMMETRIC_KEYS[side][point]: the keys of a man of side on point once the board is turned by each of the
+    # 16 symmetries, packed into one int with the key under symmetry s in bits 64 * s to 64 * s + 63.
+    # Board keeps the keys of all 16 symmetric versions of the position up to date with one xor
+    symmetricKeys = [[sum(pieceKeys[side][permutation[point]] << (64 * s) for s, permutation in enumerate(PERMUTATIONS))
+                      for point in range(24)] for side in range(2)]
+    # xored in when type -1 is the one to move
+    sideKey = key()
+    # HAND_KEYS[0][n]: the player to move has n men on hand, HAND_KEYS[1][n]: the other player has n
+    handKeys = [[key() for n in range(11)] for side in range(2)]
+    # COUNTER_KEYS[n]: n turns since the last removal in phase 2 (turn - lastChanged)
+    counterKeys = [key() for n in range(21)]
+    return pieceKeys, symmetricKeys, sideKey, handKeys, counterKeys
+
+PIECE_KEYS, SYMMETRIC_KEYS, SIDE_KEY, HAND_KEYS, COUNTER_KEYS = snapshot.load("zobrist", [__file__, symmetry.__file__, geometry.__file__], buildKeys)
+
+# men still on hand for the player to move at turn, and for the other player
+def handCounts(turn):
+    if turn > 20:
+        return 0, 0
+    return (22 - turn) // 2, (21 - turn) // 2
+
+# the part of the key that does not depend on the men on the board:
+# side to move, men on hand and the stalemate counter
+def stateKey(side, turn, lastChanged):
+    moverHand, otherHand = handCounts(turn)
+    key = HAND_KEYS[0][moverHand] ^ HAND_KEYS[1][otherHand] ^ COUNTER_KEYS[min(max(turn - lastChanged, 0), 20)]
+    if side == 1:
+        key ^= SIDE_KEY
+    return key
+
+# keys of the men on the board under each of the 16 symmetries, packed like SYMMETRIC_KEYS
+def piecesKeys(mine, theirs):
+    keys = 0
+    for side, men in ((0, mine), (1, theirs)):
+        point = 0
+        while men:
+            if men & 1:
+                keys ^= SYMMETRIC_KEYS[side][point]
+            men >>= 1
+            point += 1
+    return keys